@@ -0,0 +1,423 @@
+#!/usr/bin/env python
+# This file is part of febelfin-coda.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+"""Benchmarks for the CODA parser
+
+The input is built by repeating the statement of coda/CODA.txt.
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import pickle
+import resource
+import tempfile
+import time
+import tracemalloc
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+import coda
+
+here = os.path.dirname(__file__)
+sample = os.path.join(here, 'coda', 'CODA.txt')
+
+
+def records(statements):
+    with open(sample, encoding='windows-1252') as f:
+        lines = f.read().splitlines(keepends=True)
+    return lines * statements
+
+
+def write(statements, directory):
+    path = os.path.join(directory, 'CODA-%d.txt' % statements)
+    with open(path, 'w', encoding='windows-1252', newline='') as f:
+        f.writelines(records(statements))
+    return path
+
+
+def timeit(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def report(name, count, unit, duration):
+    print('%-30s %10.0f %s/s (%.3fs)' % (
+            name, count / duration, unit, duration))
+
+
+def bench_parse(args, directory):
+    lines = records(args.statements)
+    report('parse', len(lines), 'records',
+        timeit(lambda: coda.CODA(lines), args.repeat))
+
+
+def bench_parse_lazy(args, directory):
+    lines = records(args.statements)
+
+    def parse():
+        for statement in coda.iter_statements(lines, lazy=True):
+            for move in statement.all_moves:
+                move.amount, move.bank_reference, move.communication
+
+    report('parse lazy', len(lines), 'records', timeit(parse, args.repeat))
+
+
+def bench_parse_fields(args, directory):
+    lines = records(args.statements)
+    report('parse fields', len(lines), 'records', timeit(
+            lambda: coda.CODA(lines, fields=['communication']),
+            args.repeat))
+
+
+def bench_scan(args, directory):
+    path = write(args.statements, directory)
+    report('scan', args.statements, 'statements', timeit(
+            lambda: list(coda.scan(path)), args.repeat))
+
+
+def bench_link(args, directory):
+    statements = coda.CODA(records(args.statements)).statements
+    count = sum(len(i) for s in statements for i in s.informations.values())
+
+    def link():
+        for statement in statements:
+            statement.link_informations()
+    report('link informations', count, 'informations',
+        timeit(link, args.repeat))
+
+
+def bench_parse_many(args, directory):
+    files = 20
+    names = [write(max(args.statements // files, 1), directory)] * files
+    for workers in [0, 1, 2, 4, 8]:
+        report('parse many (%d workers)' % workers, files, 'files',
+            timeit(lambda: list(coda.parse_many(names, workers=workers)),
+                args.repeat))
+
+
+def bench_parse_workers(args, directory):
+    path = write(args.statements, directory)
+    count = len(records(args.statements))
+    for workers in [0, 1, 2, 4, 8]:
+        report('parse (%d workers)' % workers, count, 'records',
+            timeit(lambda: coda.CODA(path, workers=workers), args.repeat))
+
+
+def bench_parse_binary(args, directory):
+    path = write(args.statements, directory)
+    count = len(records(args.statements))
+    for binary in [False, True]:
+        def parse():
+            for statement in coda.iter_statements(path, binary=binary):
+                pass
+        name = 'parse %s' % ('binary' if binary else 'text')
+        report(name, count, 'records', timeit(parse, args.repeat))
+        tracemalloc.start()
+        coda.CODA(path, binary=binary)
+        print('%-30s %10.1f MiB peak' % (
+                name, tracemalloc.get_traced_memory()[1] / 2 ** 20))
+        tracemalloc.stop()
+
+
+def bench_feed(args, directory):
+    data = ''.join(records(args.statements)).encode('windows-1252')
+    count = len(records(args.statements))
+
+    def feed():
+        parser = coda.CODAParser()
+        for i in range(0, len(data), 2 ** 16):
+            parser.feed(data[i:i + 2 ** 16])
+        parser.close()
+    report('feed', count, 'records', timeit(feed, args.repeat))
+
+
+def bench_parse_validate(args, directory):
+    lines = records(args.statements)
+    for validate in coda.VALIDATIONS:
+        report('parse validate=%s' % validate, len(lines), 'records',
+            timeit(lambda: coda.CODA(lines, validate=validate), args.repeat))
+
+
+def bench_events(args, directory):
+    lines = records(args.statements)
+
+    def events():
+        families = Counter()
+        for event, move in coda.iter_events(lines):
+            if event == 'move':
+                families[move.transaction_family] += 1
+
+    def statements():
+        families = Counter()
+        for statement in coda.iter_statements(lines):
+            for move in statement.all_moves:
+                families[move.transaction_family] += 1
+    report('count families (events)', len(lines), 'records',
+        timeit(events, args.repeat))
+    report('count families (parse)', len(lines), 'records',
+        timeit(statements, args.repeat))
+
+
+def bench_cache(args, directory):
+    path = write(args.statements, directory)
+    count = len(records(args.statements))
+    report('cache none', count, 'records',
+        timeit(lambda: coda.CODA(path), args.repeat))
+    for memory in [0, 1]:
+        cache = coda.ParseCache(
+            os.path.join(directory, 'cache-%d' % memory), memory=memory)
+
+        def miss():
+            cache.clear()
+            coda.CODA(path, cache=cache)
+        report('cache miss', count, 'records', timeit(miss, args.repeat))
+        coda.CODA(path, cache=cache)
+        report('cache hit (memory %d)' % memory, count, 'records', timeit(
+                lambda: coda.CODA(path, cache=cache), args.repeat))
+    print('%-30s %10.1f MiB' % ('cache entry', cache.info().size / 2 ** 20))
+
+
+def bench_serialize(args, directory):
+    statements = coda.CODA(records(args.statements)).statements
+    count = sum(1 for s in statements for _ in s.all_moves)
+    for name, dumps, loads in [
+            ('pickle', pickle.dumps, pickle.loads),
+            ('dumps', coda.dumps, coda.loads),
+            ]:
+        data = dumps(statements)
+        report('%s dump' % name, count, 'moves',
+            timeit(lambda: dumps(statements), args.repeat))
+        report('%s load' % name, count, 'moves',
+            timeit(lambda: loads(data), args.repeat))
+        print('%-30s %10.1f MiB (%.1f MiB compressed)' % (
+                name, len(data) / 2 ** 20, len(zlib.compress(data)) / 2 ** 20))
+
+
+def _parse_rss(path, intern):
+    start = time.perf_counter()
+    statements = coda.CODA(path, intern=intern).statements
+    duration = time.perf_counter() - start
+    moves = sum(1 for s in statements for _ in s.all_moves)
+    return moves, duration, resource.getrusage(
+        resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def bench_intern(args, directory):
+    path = write(args.statements, directory)
+    context = multiprocessing.get_context('spawn')
+    for intern in [False, True]:
+        # A new interpreter per run to measure its own peak RSS
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            moves, duration, rss = executor.submit(
+                _parse_rss, path, intern).result()
+        name = 'parse intern=%s' % intern
+        report(name, moves, 'moves', duration)
+        print('%-30s %10.1f MiB max RSS' % (name, rss))
+
+
+def bench_flat(args, directory):
+    lines = records(args.statements)
+    for flat in [False, True]:
+        name = 'flat=%s' % flat
+        report('parse %s' % name, len(lines), 'records',
+            timeit(lambda: coda.CODA(lines, flat=flat), args.repeat))
+        tracemalloc.start()
+        statements = coda.CODA(lines, flat=flat).statements
+        moves = sum(1 for s in statements for _ in s.all_moves)
+        print('%-30s %10.0f bytes/move' % (
+                'memory %s' % name,
+                tracemalloc.get_traced_memory()[0] / moves))
+        tracemalloc.stop()
+
+        def iterate():
+            for statement in statements:
+                for move in statement.all_moves:
+                    pass
+        report('all moves %s' % name, moves, 'moves',
+            timeit(iterate, args.repeat))
+
+
+def bench_reconcile(args, directory):
+    from coda.reconcile import OpenItem, Reconciler
+    statements = coda.CODA(records(args.statements)).statements
+    count = 10 ** 6
+    # The moves of the sample are among random open items
+    items = [
+        OpenItem(i, m.amount, m.communication, m.value_date)
+        for i, m in enumerate(statements[0].all_moves)]
+    for i in range(len(items), count):
+        base = 10 ** 9 + i
+        items.append(OpenItem(i, Decimal(i).scaleb(-2),
+                '%010d%02d' % (base, base % 97 or 97), date(2006, 12, 6)))
+    start = time.perf_counter()
+    reconciler = Reconciler(items, days=3)
+    report('reconcile index', count, 'items', time.perf_counter() - start)
+    moves = sum(1 for s in statements for _ in s.all_moves)
+    report('reconcile match', moves, 'moves',
+        timeit(lambda: reconciler.match(statements), args.repeat))
+
+
+def bench_chain(args, directory):
+    from coda.chain import ChainIndex
+    files = 20
+    names = [write(max(args.statements // files, 1), directory)] * files
+    index = ChainIndex(os.path.join(directory, 'chain'))
+    report('chain rebuild', files, 'files',
+        timeit(lambda: index.rebuild(names), args.repeat))
+    summary, = coda.scan(sample)
+
+    def check():
+        for _ in range(args.statements):
+            index.check(summary)
+    report('chain check', args.statements, 'statements',
+        timeit(check, args.repeat))
+
+
+def bench_merge(args, directory):
+    files = 20
+    names = [write(max(args.statements // files, 1), directory)] * files
+    count = files * max(args.statements // files, 1) * sum(
+        len(s.moves) for s in coda.CODA(sample).statements)
+
+    def merge():
+        for _ in coda.merge_moves(
+                [coda.iter_statements(n) for n in names]):
+            pass
+
+    def sort():
+        moves = [(s, m) for n in names for s in coda.CODA(n).statements
+            for m in s.moves]
+        moves.sort(key=lambda p: p[1].value_date)
+    for name, func in [('merge', merge), ('load and sort', sort)]:
+        report(name, count, 'moves', timeit(func, args.repeat))
+        tracemalloc.start()
+        func()
+        print('%-30s %10.1f MiB peak' % (
+                name, tracemalloc.get_traced_memory()[1] / 2 ** 20))
+        tracemalloc.stop()
+
+
+def bench_communication(args, directory):
+    statements = coda.CODA(records(args.statements)).statements
+    moves = [m for s in statements for m in s.all_moves]
+
+    def read():
+        for move in moves:
+            for _ in range(5):
+                move.communication_type, move.communication
+    report('read communications x5', len(moves), 'moves',
+        timeit(read, args.repeat))
+
+
+def bench_informations(args, directory):
+    statements = coda.CODA(records(args.statements)).statements
+    count = sum(len(i) for s in statements for i in s.informations.values())
+
+    def probe():
+        names = []
+        for statement in statements:
+            for informations in statement.informations.values():
+                for information in informations:
+                    try:
+                        names.append(information.name)
+                    except AttributeError:
+                        pass
+
+    def by_type():
+        names = []
+        for statement in statements:
+            for type_ in ['001', '008', '009', '010', '011']:
+                for information in statement.informations_by_type[type_]:
+                    names.append(information.name)
+    report('names (probe)', count, 'informations', timeit(probe, args.repeat))
+    report('names (by type)', count, 'informations',
+        timeit(by_type, args.repeat))
+
+
+def bench_columns(args, directory):
+    if not importlib.util.find_spec('numpy'):
+        print('columns: numpy is not installed')
+        return
+    statements = coda.CODA(records(args.statements)).statements
+    count = sum(1 for s in statements for _ in s.all_moves)
+
+    def columns():
+        for statement in statements:
+            statement.to_columns()
+    report('to columns', count, 'moves', timeit(columns, args.repeat))
+
+
+def bench_parquet(args, directory):
+    if not importlib.util.find_spec('pyarrow'):
+        print('parquet: pyarrow is not installed')
+        return
+    from coda.parquet import write_many
+    files = 20
+    names = [write(max(args.statements // files, 1), directory)] * files
+    output = os.path.join(directory, 'parquet')
+    for batch_size in [1024, 65536]:
+        report('parquet (batch %d)' % batch_size, files, 'files', timeit(
+                lambda: write_many(
+                    names, output, workers=0, batch_size=batch_size),
+                args.repeat))
+    print('%-30s %10.1f MiB max RSS' % (
+            'parquet', resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss / 2 ** 10))
+
+
+BENCHMARKS = {
+    'cache': bench_cache,
+    'chain': bench_chain,
+    'columns': bench_columns,
+    'communication': bench_communication,
+    'events': bench_events,
+    'feed': bench_feed,
+    'flat': bench_flat,
+    'informations': bench_informations,
+    'intern': bench_intern,
+    'link': bench_link,
+    'merge': bench_merge,
+    'parquet': bench_parquet,
+    'parse': bench_parse,
+    'parse-fields': bench_parse_fields,
+    'parse-binary': bench_parse_binary,
+    'parse-lazy': bench_parse_lazy,
+    'parse-many': bench_parse_many,
+    'parse-validate': bench_parse_validate,
+    'parse-workers': bench_parse_workers,
+    'reconcile': bench_reconcile,
+    'scan': bench_scan,
+    'serialize': bench_serialize,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('benchmark', nargs='*',
+        help="the benchmarks to run among %s (default: all)" % ', '.join(
+            sorted(BENCHMARKS)))
+    parser.add_argument('-s', '--statements', type=int, default=1000,
+        help="the number of statements in the input (default: %(default)s)")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+        help="the number of runs to keep the best (default: %(default)s)")
+    args = parser.parse_args()
+    for name in args.benchmark:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark: %s" % name)
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.benchmark or sorted(BENCHMARKS):
+            BENCHMARKS[name](args, directory)
+
+
+if __name__ == '__main__':
+    main()
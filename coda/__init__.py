@@ -2,158 +2,664 @@
 # this repository contains the full copyright notices and license terms.
 """a parser for CODA files
 """
+import asyncio
+import codecs
+import functools
+import hashlib
+import heapq
 import io
-from collections import defaultdict
-from datetime import datetime
+import itertools
+import marshal
+import mmap
+import operator
+import os
+import pickle
+import re
+import tempfile
+import types
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict, deque, namedtuple
+from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
 from decimal import Decimal
 
 __version__ = '0.4.2'
-__all__ = ['CODA', 'Statement', 'Move', 'Information', 'FreeCommunication']
+__all__ = ['CODA', 'CODAParser', 'iter_statements', 'aiter_statements',
+    'iter_events', 'parse_many', 'merge_moves', 'scan', 'ParseCache',
+    'dumps', 'loads',
+    'Statement', 'StatementSummary', 'Move', 'Information',
+    'FreeCommunication']
 
 
 class CODA(object):
 
-    def __init__(self, name, encoding='windows-1252'):
-        self.statements = []
-
-        if isinstance(name, (bytes, str)):
-            with io.open(name, encoding=encoding, mode='r') as f:
-                self._parse(f)
+    def __init__(self, name, encoding='windows-1252', lazy=False,
+            fields=None, workers=0, binary=False, validate='strict',
+            cache=None, intern=False, flat=False):
+        kwargs = dict(encoding=encoding, lazy=lazy, fields=fields,
+            workers=workers, binary=binary, validate=validate, intern=intern,
+            flat=flat)
+        if cache is not None and isinstance(name, (bytes, str) + _BUFFERS):
+            self.statements = cache.parse(name, **kwargs)
         else:
-            self._parse(name)
-
-    def _parse(self, f):
-        statement = None
-        total_credit, total_debit = 0, 0
-        move = None
-        information = None
-        i = 0
-        for record in f:
-            type_ = record[0]
-            if type_ == '0':
-                statement = Statement()
-                self.statements.append(statement)
-                self._parse_statement(record, statement, HEADER)
-
-                if statement.version != 2:
-                    raise ValueError(
-                        "Unsupported version %d" % statement.version)
-            elif type_ == '1':
-                self._parse_statement(record, statement, OLD_BALANCE)
-                i += 1
-            elif type_ == '2':
-                article = record[1]
-                if article == '1':
-                    move = Move()
-                self._parse_move(record, article, move)
-                if article == '1':
-                    transaction_type = move.transaction_type
-                    if transaction_type in {'0', '1', '2', '3'}:
-                        statement.moves.append(move)
-
-                        if move.amount > 0:
-                            total_credit += move.amount
-                        else:
-                            total_debit -= move.amount
-                    elif transaction_type in {'5', '6', '7', '8'}:
-                        parent = statement.moves[-1]
-                        assert parent.sequence == move.sequence
-                        parent.moves.append(move)
-                    elif transaction_type == '9':
-                        parent = statement.moves[-1].moves[-1]
-                        assert parent.sequence == move.sequence
-                        parent.append(move)
-                    else:
-                        raise ValueError('Unknown type: %s' % transaction_type)
-                i += 1
-            elif type_ == '3':
-                article = record[1]
-                if article == '1':
-                    information = Information()
-                self._parse_information(record, article, information)
-                if article == '1':
-                    key = information.bank_reference
-                    statement.informations[key].append(information)
-                i += 1
-            elif type_ == '4':
-                free_communication = FreeCommunication()
-                self._parse_free_communication(record, free_communication)
-                statement.free_communications.append(free_communication)
-            elif type_ == '8':
-                self._parse_statement(record, statement, NEW_BALANCE)
-                i += 1
-            elif type_ == '9':
-                self._parse_statement(record, statement, TRAILER)
-
-                assert (statement.new_balance - statement.old_balance
-                    == statement.total_credit - statement.total_debit)
-                assert statement.total_credit == total_credit
-                assert statement.total_debit == total_debit
-                assert statement.number_records == i
-                statement = None
-                total_credit, total_debit = 0, 0
-                i = 0
-
-    def _parse_statement(self, record, statement, desc):
-        for name, (slice_, parser) in desc.items():
-            value = parser(record[slice_])
-            if getattr(statement, name) is not None:
-                assert getattr(statement, name) == value, (name, value,
-                    getattr(statement, name), statement)
-            setattr(statement, name, value)
-
-    def _parse_move(self, record, article, move):
-        for name, (slice_, parser) in MOVE_COMMON.items():
-            value = parser(record[slice_])
-            if getattr(move, name) is not None:
-                assert getattr(move, name) == value
+            self.statements = list(iter_statements(name, **kwargs))
+
+    def moves_table(self):
+        """Return the moves of all statements as a NumPy structured array
+
+        It has the columns of Statement.to_columns and the index of the
+        statement.
+        """
+        return _moves_columns(self.statements)
+
+
+def iter_statements(
+        name, encoding='windows-1252', lazy=False, fields=None, workers=0,
+        binary=False, validate='strict', intern=False, flat=False):
+    """Yield each statement of the file as soon as its trailer is checked
+
+    name is the path of the file (str or bytes like for open), an iterable
+    of lines or a buffer (mmap, bytearray or memoryview) of the content.
+    The bytes content is parsed from memoryview(content) which shares it.
+
+    In lazy mode, the fields are decoded from the records on first access.
+    If fields is set, only those fields of the moves and informations are
+    decoded (in addition to those needed to check the statement), the
+    others stay None. In lazy mode, it does not restrict the fields.
+    If workers is not 0, the statements of the file are parsed in a pool of
+    workers processes (None for the number of processors).
+    In binary mode, the file is memory-mapped and the records are sliced as
+    bytes, only the fields are decoded. The statements are the same as in
+    text mode and the content is not copied, but decoding each field makes
+    the parsing about 20% slower.
+    validate is the level of checks raising ValueError:
+    - strict: the repeated fields, the sequences of the details and the
+      totals
+    - totals: only the balances, the totals and the number of records
+    - none: nothing, for files already checked
+    At every level, a statement without trailer record raises ValueError
+    because it would be lost.
+    If intern is set, the equal values of the fields with few distinct
+    values (like sequence, transaction_code or purpose) are shared by the
+    objects of the file. It does not apply to the lazy mode.
+    If flat is set, the moves of all levels of each statement are stored in
+    a single list in file order and the moves of the statement and of each
+    move are views of it. Iterating all_moves is then a single loop (about
+    7 times faster) but the parsing is about 20% slower and the memory per
+    move is almost the same. It does not apply to the lazy mode.
+    """
+    options = dict(lazy=lazy, fields=fields, validate=validate, intern=intern,
+        flat=flat)
+    if workers != 0 and isinstance(name, (bytes, str)):
+        yield from _parse_parallel(name, encoding, workers, options)
+    elif binary or isinstance(name, _BUFFERS):
+        yield from _parse_binary(name, encoding, options)
+    elif isinstance(name, (bytes, str)):
+        with io.open(name, encoding=encoding, mode='r') as f:
+            yield from _parse_records(_parser(**options), f)
+    else:
+        yield from _parse_records(_parser(**options), name)
+
+
+def _parse_records(parser, records):
+    "Yield the statements of the records and check the last one is complete"
+    yield from parser.parse(records)
+    if parser.statement is not None:
+        raise ValueError("Missing trailer record")
+
+
+_BUFFERS = (mmap.mmap, bytearray, memoryview)
+
+
+def _parse_binary(name, encoding, options):
+    if isinstance(name, (bytes, str)):
+        with io.open(name, mode='rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(
+                        f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    yield from _parse_binary(buffer, encoding, options)
+        return
+    records = _binary_records(name)
+    if options['lazy']:
+        # The lazy objects decode their fields from str records
+        records = (r.decode(encoding) for r in records)
+        yield from _parse_records(_parser(**options), records)
+    else:
+        yield from _parse_records(
+            _parser(encoding=encoding, **options), records)
+
+
+def _binary_records(buffer):
+    "Return the lines of buffer with the newlines translated like text files"
+    if (isinstance(buffer, memoryview) and isinstance(buffer.obj, bytes)
+            and buffer.nbytes == len(buffer.obj)):
+        # The view of a whole bytes content
+        buffer = buffer.obj
+    if isinstance(buffer, (bytes, mmap.mmap)) and buffer.find(b'\r') < 0:
+        if isinstance(buffer, mmap.mmap):
+            buffer.seek(0)
+            return iter(buffer.readline, b'')
+        # BytesIO shares the buffer of bytes
+        return io.BytesIO(buffer)
+    return _translate_newlines(buffer)
+
+
+# The lines ending with \r\n, \r or \n and the last one without newline
+_LINE = re.compile(rb'[^\r\n]*(?:\r\n?|\n)|[^\r\n]+')
+
+
+def _translate_newlines(buffer):
+    # Only each line is copied out of the buffer
+    for match in _LINE.finditer(buffer):
+        record = match.group()
+        if record.endswith(b'\r\n'):
+            record = record[:-2] + b'\n'
+        elif record.endswith(b'\r'):
+            record = record[:-1] + b'\n'
+        yield record
+
+
+def _parse_parallel(name, encoding, workers, options):
+    "Yield the statements of the file parsed by a pool of processes"
+    with io.open(name, mode='rb') as f:
+        data = f.read()
+    segments = _split_statements(data)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Group the statements to reduce the overhead of each task
+    size = -(-len(segments) // (workers * 4)) or 1
+    chunks = [segments[i:i + size] for i in range(0, len(segments), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parse = functools.partial(
+            _parse_segments, encoding=encoding, options=options)
+        for statements in executor.map(
+                parse, chunks, range(1, len(segments) + 1, size)):
+            yield from statements
+
+
+def _split_statements(data):
+    "Return the segments of data starting at each header record"
+    starts = [m.start() for m in _HEADER_RECORD.finditer(data)]
+    if not starts:
+        return [data] if data.strip() else []
+    starts[0] = 0
+    return [data[start:end] for start, end in zip(starts, starts[1:] + [None])]
+
+
+_HEADER_RECORD = re.compile(rb'^0', re.MULTILINE)
+
+
+def _parse_segments(segments, first, encoding, options):
+    parser = _parser(**options)
+    statements = []
+    for i, segment in enumerate(segments, first):
+        records = io.StringIO(segment.decode(encoding), newline=None)
+        try:
+            statements.extend(_parse_records(parser, records))
+        except Exception as exception:
+            raise ValueError(
+                "Invalid statement %d: %r" % (i, exception)) from exception
+    return statements
+
+
+class CODAParser(object):
+    """Parser fed with chunks of a CODA file
+
+    The chunks are bytes decoded with encoding or str.
+    feed and close return the statements completed by the chunk.
+    """
+
+    def __init__(self, encoding='windows-1252', lazy=False, fields=None,
+            validate='strict', intern=False, flat=False):
+        self._encoding = encoding
+        self._decoder = None
+        self._empty = ''
+        # The last line until its newline is fed
+        self._pending = ''
+        self._parser = _parser(
+            lazy, fields, validate=validate, intern=intern, flat=flat)
+
+    def feed(self, data):
+        if self._decoder is None:
+            if isinstance(data, str):
+                decoder = None
             else:
-                setattr(move, name, value)
-        for name, (slice_, parser) in MOVE[article].items():
-            value = parser(record[slice_])
-            if getattr(move, name):
-                value = getattr(move, name) + value
-            setattr(move, name, value)
-
-    def _parse_information(self, record, article, information):
-        for name, (slice_, parser) in INFORMATION_COMMON.items():
-            value = parser(record[slice_])
-            if getattr(information, name) is not None:
-                assert getattr(information, name) == value
-            else:
-                setattr(information, name, value)
-        for name, (slice_, parser) in INFORMATION[article].items():
-            value = parser(record[slice_])
-            if getattr(information, name):
-                value = getattr(information, name) + value
-            setattr(information, name, value)
+                decoder = codecs.getincrementaldecoder(self._encoding)()
+                self._empty = b''
+            self._decoder = io.IncrementalNewlineDecoder(
+                decoder, translate=True)
+        return self._parse(self._decoder.decode(data))
+
+    def close(self):
+        statements = []
+        if self._decoder is not None:
+            statements = self._parse(
+                self._decoder.decode(self._empty, final=True))
+        if self._pending:
+            statements.extend(self._parser.parse([self._pending]))
+            self._pending = ''
+        if self._parser.statement is not None:
+            raise ValueError("Missing trailer record")
+        return statements
+
+    def _parse(self, text):
+        records = (self._pending + text).split('\n')
+        self._pending = records.pop()
+        return list(self._parser.parse(r + '\n' for r in records))
+
+
+async def aiter_statements(
+        stream, encoding='windows-1252', lazy=False, fields=None,
+        validate='strict', executor=None, size=2 ** 16, intern=False,
+        flat=False):
+    """Yield asynchronously the statements read from stream
+
+    stream is an asyncio.StreamReader or an asynchronous iterable of bytes.
+    The control is given back to the event loop after each chunk.
+    If executor is set (a thread pool), the chunks are parsed in it.
+    """
+    loop = asyncio.get_running_loop()
+    parser = CODAParser(
+        encoding=encoding, lazy=lazy, fields=fields, validate=validate,
+        intern=intern, flat=flat)
+
+    async def chunks():
+        if hasattr(stream, 'read'):
+            while True:
+                chunk = await stream.read(size)
+                if not chunk:
+                    break
+                yield chunk
+        else:
+            async for chunk in stream:
+                yield chunk
 
-    def _parse_free_communication(self, record, free_communication):
-        for name, (slice_, parser) in FREE_COMMUNICATION.items():
-            value = parser(record[slice_])
-            setattr(free_communication, name, value)
+    async for chunk in chunks():
+        if executor is not None:
+            statements = await loop.run_in_executor(
+                executor, parser.feed, chunk)
+        else:
+            statements = parser.feed(chunk)
+            await asyncio.sleep(0)
+        for statement in statements:
+            yield statement
+    for statement in parser.close():
+        yield statement
+
+
+def parse_many(names, workers=None, ordered=True, **kwargs):
+    """Yield the pair of each name and its CODA parsed in a process pool
+
+    The CODA is replaced by the exception raised if the parsing failed.
+    The pairs are yielded in the order of names if ordered is set otherwise
+    in the order of completion.
+    workers is the number of processes, None for the number of processors
+    and 0 to parse in the current process.
+    Only twice as many files as workers are submitted ahead of the pair
+    yielded so the memory does not grow with the number of names.
+    The other keyword arguments are passed to CODA.
+    """
+    if workers == 0:
+        for name in names:
+            yield name, _parse_file(name, kwargs)
+        return
+    if workers is None:
+        workers = os.cpu_count() or 1
+    names = iter(names)
+    # The pending files are bounded to keep only a few results in memory
+    window = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # The futures in the order of submission
+        pending = {}
+
+        def submit():
+            for name in itertools.islice(names, window - len(pending)):
+                pending[executor.submit(_parse_file, name, kwargs)] = name
+        submit()
+        while pending:
+            if ordered:
+                future = next(iter(pending))
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = next(f for f in pending if f in done)
+            name = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as exception:
+                result = exception
+            del future
+            submit()
+            yield name, result
+
+
+def _parse_file(name, kwargs):
+    try:
+        return CODA(name, **kwargs)
+    except Exception as exception:
+        return exception
+
+
+def merge_moves(inputs, key='value_date', details=False):
+    """Yield the pairs of statement and move of the inputs ordered by key
+
+    inputs are iterables of statements like iter_statements.
+    key is the name of the field of the moves, like value_date or
+    entry_date.
+    If details is set, the moves of all levels are merged, otherwise only
+    the first level.
+    Only one move per input is pending so the moves of each input must be
+    ordered by key, those which are not are yielded as soon as they are
+    read.
+    """
+    get_key = operator.attrgetter(key)
+
+    def moves(statements):
+        for statement in statements:
+            for move in (statement.all_moves if details else statement.moves):
+                yield statement, move
+    yield from heapq.merge(
+        *map(moves, inputs), key=lambda pair: get_key(pair[1]))
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'memory_hits', 'misses', 'size'])
+
+
+class ParseCache(object):
+    """A cache of the statements parsed from files
+
+    The statements are stored compressed in directory under the hash of the
+    content of the file, the version and the parsing options.
+    The least recently used entries are removed when the directory exceeds
+    max_size bytes. The memory most recently used entries are also kept in
+    memory. The directory is emptied when it was filled by another version.
+    """
+    _suffix = '.coda'
+
+    def __init__(self, directory, max_size=2 ** 30, memory=0):
+        self.directory = directory
+        self.max_size = max_size
+        self.memory = memory
+        self._memory = OrderedDict()
+        self.hits = self.memory_hits = self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        version = os.path.join(directory, 'VERSION')
+        try:
+            with io.open(version) as f:
+                current = f.read()
+        except FileNotFoundError:
+            current = None
+        if current != __version__:
+            self.clear()
+            with io.open(version, 'w') as f:
+                f.write(__version__)
+
+    def parse(self, name, encoding='windows-1252', lazy=False, fields=None,
+            workers=0, binary=False, validate='strict', intern=False,
+            flat=False):
+        """Return the list of statements of the file
+
+        The arguments are those of iter_statements, name must be a path or
+        a buffer.
+        """
+        options = dict(lazy=lazy, fields=fields, validate=validate,
+            intern=intern, flat=flat)
+        if isinstance(name, (bytes, str)):
+            with io.open(name, mode='rb') as f:
+                data = f.read()
+        else:
+            data = bytes(name)
+        key = self._key(data, encoding, options)
+        value = self._get(key)
+        if value is not None:
+            return pickle.loads(zlib.decompress(value))
+        self.misses += 1
+        if workers != 0 and isinstance(name, (bytes, str)):
+            source = name
+        elif binary:
+            source = memoryview(data)
+        else:
+            source = io.TextIOWrapper(io.BytesIO(data), encoding=encoding)
+        statements = list(iter_statements(
+                source, encoding=encoding, workers=workers, binary=binary,
+                **options))
+        # The fastest level compresses already about 4 times
+        self._set(key, zlib.compress(
+                pickle.dumps(statements, pickle.HIGHEST_PROTOCOL), 1))
+        return statements
+
+    def info(self):
+        """Return the statistics and the size of the directory
+
+        hits counts the entries read from the directory and memory_hits
+        those found in memory.
+        """
+        return CacheInfo(self.hits, self.memory_hits, self.misses,
+            sum(e.stat().st_size for e in self._entries()))
+
+    def clear(self):
+        "Remove all the entries"
+        self._memory.clear()
+        for entry in self._entries():
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _key(self, data, encoding, options):
+        fields = options['fields']
+        if fields is not None:
+            fields = sorted(fields)
+        key = hashlib.sha256(repr((
+                    __version__, encoding, options['lazy'], fields,
+                    options['validate'], options['intern'],
+                    options['flat'])).encode())
+        key.update(data)
+        return key.hexdigest()
+
+    def _entries(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self._suffix):
+                yield entry
+
+    def _get(self, key):
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return value
+        path = os.path.join(self.directory, key + self._suffix)
+        try:
+            with io.open(path, mode='rb') as f:
+                value = f.read()
+            # The modification time orders the entries to remove
+            os.utime(path)
+        except FileNotFoundError:
+            return
+        self.hits += 1
+        self._remember(key, value)
+        return value
+
+    def _set(self, key, value):
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with io.open(fd, mode='wb') as f:
+            f.write(value)
+        os.replace(path, os.path.join(self.directory, key + self._suffix))
+        self._remember(key, value)
+        self._evict()
+
+    def _remember(self, key, value):
+        if self.memory:
+            self._memory[key] = value
+            while len(self._memory) > self.memory:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(e[1] for e in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+
+def iter_events(name, encoding='windows-1252', validate='strict'):
+    """Yield the events of the file as pairs of name and object
+
+    The events are:
+    - start_statement: a Statement after its old balance
+    - move: a Move with all its articles
+    - information: an Information with all its articles
+    - free_communication: a FreeCommunication
+    - end_statement: the Statement after its trailer is checked
+    The objects decode their fields on first access and the statement is not
+    filled with the moves, informations and free communications.
+    """
+    if validate not in VALIDATIONS:
+        raise ValueError("Unknown validation: %s" % validate)
+    if isinstance(name, (bytes, str)):
+        with io.open(name, encoding=encoding, mode='r') as f:
+            yield from _iter_events(f, validate)
+    else:
+        yield from _iter_events(name, validate)
+
+
+def _iter_events(f, validate):
+    parser = _lazy_parser(_EventParser, validate)
+    events = parser.events
+    records = iter(f)
+    while True:
+        # The events are yielded after each batch of records
+        batch = list(itertools.islice(records, 64))
+        if not batch:
+            break
+        for statement in parser.parse(batch):
+            parser.end(statement)
+            yield from events
+            events.clear()
+            yield 'end_statement', statement
+        yield from events
+        events.clear()
+    if parser.statement is not None:
+        raise ValueError("Missing trailer record")
+
+
+def scan(name, encoding='windows-1252'):
+    """Yield the summary of each statement of the file
+
+    Only the header, balance and trailer records are decoded and parsed, the
+    other records are just counted.
+    name may also be an iterable of records, the records in bytes (like the
+    lines of a file opened in binary mode) are decoded with encoding.
+    """
+    if isinstance(name, (bytes, str)):
+        with io.open(name, mode='rb') as f:
+            yield from _scan(f, encoding)
+    else:
+        records = iter(name)
+        first = next(records, None)
+        if first is None:
+            return
+        records = itertools.chain([first], records)
+        if isinstance(first, (bytes, bytearray)):
+            yield from _scan(records, encoding)
+        else:
+            yield from _scan(records)
+
+
+def _scan(f, encoding=None):
+    if encoding:
+        counted, skipped = {b'2', b'3'}, b'4'
+        f = _split_lines(f)
+    else:
+        counted, skipped = {'2', '3'}, '4'
+    summary = None
+    i = 0
+    for record in f:
+        type_ = record[:1]
+        if type_ in counted:
+            i += 1
+            continue
+        elif type_ == skipped:
+            continue
+        if encoding:
+            record = record.decode(encoding)
+        type_ = record[0]
+        if type_ == '0':
+            summary = StatementSummary()
+            _parse_header(record, summary)
+
+            if summary.version != 2:
+                raise ValueError("Unsupported version %d" % summary.version)
+        elif type_ == '1':
+            _parse_old_balance(record, summary)
+            i += 1
+        elif type_ == '8':
+            _parse_new_balance(record, summary)
+            i += 1
+        elif type_ == '9':
+            _parse_trailer(record, summary)
+
+            _check_trailer(summary, i)
+            yield summary
+            summary = None
+            i = 0
+    if summary is not None:
+        raise ValueError("Missing trailer record")
+
+
+def _split_lines(records):
+    "Yield the bytes records split also on the lone carriage returns"
+    for record in records:
+        # A record has 128 characters and its newline
+        if len(record) > 130:
+            yield from record.splitlines(keepends=True)
+        else:
+            yield record
 
 
+@functools.lru_cache(maxsize=1024)
 def _date(value):
-    return datetime.strptime(value, '%d%m%y').date()
+    # A file contains only a handful of distinct dates
+    year = int(value[4:6])
+    # same pivot as the %y directive of strptime
+    year += 1900 if year >= 69 else 2000
+    return date(year, int(value[2:4]), int(value[0:2]))
 
 
 def _string(value):
     return value.rstrip()
 
 
+def _duplicate(value):
+    return value == 'D'
+
+
 def _amount(value):
-    sign = value[0:1]
-    amount = Decimal(value[1:])
-    if sign == '1':
-        amount *= -1
-    return amount / 1000
+    # Build directly the Decimal of value / 1000 with the same exponent
+    integer, fraction = value[1:-3], value[-3:].rstrip('0')
+    if fraction:
+        integer += '.' + fraction
+    if value[0:1] == '1':
+        integer = '-' + integer
+    return Decimal(integer)
 
 
 HEADER = {
     'creation_date': (slice(5, 11), _date),
     'bank_id': (slice(11, 14), int),
-    'duplicate': (slice(16, 17), lambda c: c == 'D'),
+    'duplicate': (slice(16, 17), _duplicate),
     'file_reference': (slice(24, 34), _string),
     'address': (slice(34, 60), _string),
     'bic': (slice(60, 71), _string),
@@ -185,11 +691,63 @@ NEW_BALANCE = {
     }
 
 
+def _slots(cls):
+    "Return the slots of cls and of its bases"
+    slots = {}
+    for klass in reversed(cls.__mro__):
+        slots.update(dict.fromkeys(getattr(klass, '__slots__', ())))
+    return list(slots)
+
+
+def _compile_state(cls, exclude=()):
+    """Set the functions storing the slots of cls as a tuple
+
+    The excluded slots are not stored and stay unset.
+    """
+    slots = [s for s in _slots(cls) if s not in exclude]
+    attributes = ', '.join('self.%s' % s for s in slots)
+    namespace = {}
+    exec('\n'.join([
+                'def _getstate(self):',
+                '    return (%s,)' % attributes,
+                'def _setstate(self, state):',
+                '    %s, = state' % attributes,
+                ]), namespace)
+    cls._getstate = namespace['_getstate']
+    cls._setstate = namespace['_setstate']
+
+
 class _SlotsNone(object):
+    # The slots set to None on creation
+    _none_slots = ()
+    # The slots rebuilt instead of stored in the state
+    _transient_slots = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super(_SlotsNone, cls).__init_subclass__(**kwargs)
+        # The lazy fields stay unset and the slots overridden by a property
+        # are not stored
+        lazy_fields = getattr(cls, '_lazy_fields', {})
+        cls._none_slots = tuple(
+            name for name in _slots(cls)
+            if name not in lazy_fields
+            and isinstance(getattr(cls, name), types.MemberDescriptorType))
+        # Nor are the lazy fields decoded again from the records and the
+        # transient slots
+        _compile_state(cls, exclude=set(_slots(cls))
+            - set(cls._none_slots) | set(cls._transient_slots))
+
     def __init__(self, *args, **kwargs):
-        super(_SlotsNone, self).__init__(*args, **kwargs)
-        for name in self.__slots__:
+        for name in self._none_slots:
             setattr(self, name, None)
+        super(_SlotsNone, self).__init__(*args, **kwargs)
+
+    # The state is the tuple of the slots set by _compile_state
+    def __getstate__(self):
+        return self._getstate()
+
+    def __setstate__(self, state):
+        self._setstate(state)
 
 
 class _Moves(object):
@@ -197,6 +755,9 @@ class _Moves(object):
 
     def __init__(self, *args, **kwargs):
         super(_Moves, self).__init__(*args, **kwargs)
+        self._init_moves()
+
+    def _init_moves(self):
         self.moves = []
 
     def find_move(self, sequence, detail_sequence='0000'):
@@ -216,15 +777,7 @@ class _Moves(object):
                 yield move
 
 
-class Statement(_SlotsNone, _Moves):
-    __slots__ = (list(HEADER.keys()) + list(TRAILER.keys())
-        + list(OLD_BALANCE.keys()) + list(NEW_BALANCE.keys())
-        + ['informations', 'free_communications'])
-
-    def __init__(self, *args, **kwargs):
-        super(Statement, self).__init__(*args, **kwargs)
-        self.informations = defaultdict(list)
-        self.free_communications = []
+class _AccountMixin(object):
 
     def __str__(self):
         if self.old_sequence != self.new_sequence:
@@ -256,6 +809,115 @@ class Statement(_SlotsNone, _Moves):
             return self._account_currency[17:19]
 
 
+class Statement(_SlotsNone, _Moves, _AccountMixin):
+    __slots__ = (list(HEADER.keys()) + list(TRAILER.keys())
+        + list(OLD_BALANCE.keys()) + list(NEW_BALANCE.keys())
+        + ['informations', 'informations_by_type', 'free_communications',
+            '_moves_index'])
+    # The index references the moves
+    _transient_slots = ('_moves_index',)
+
+    def __init__(self, *args, **kwargs):
+        super(Statement, self).__init__(*args, **kwargs)
+        self.informations = defaultdict(list)
+        # The informations by communication type (None for unstructured)
+        self.informations_by_type = defaultdict(list)
+        self.free_communications = []
+        # filled by the parser with the moves of all levels
+        self._moves_index = None
+
+    def __setstate__(self, state):
+        self._setstate(state)
+        self._moves_index = _index_moves(self.moves)
+
+    def find_move(self, sequence, detail_sequence='0000'):
+        if self._moves_index is None:
+            return super(Statement, self).find_move(sequence, detail_sequence)
+        return self._moves_index.get((sequence, detail_sequence))
+
+    def link_informations(self):
+        """Set on each move the list of its informations
+
+        An information belongs to the move which precedes it with the same
+        sequence.
+        """
+        for move in self.all_moves:
+            move.informations = []
+        for informations in self.informations.values():
+            for information in informations:
+                sequence = information.sequence
+                detail_sequence = int(information.detail_sequence)
+                while detail_sequence > 0:
+                    detail_sequence -= 1
+                    move = self.find_move(
+                        sequence, '%04d' % detail_sequence)
+                    if move is not None:
+                        move.informations.append(information)
+                        break
+
+    def to_columns(self):
+        """Return the moves of all levels as a NumPy structured array
+
+        The columns are: amount in thousandths, value_date, entry_date,
+        transaction_code, sequence, detail_sequence and the index of the
+        parent move (-1 for the first level).
+        """
+        return _moves_columns([self], statement=False)
+
+
+def _index_moves(moves):
+    "Return the index of the moves of all levels like the parser"
+    index = {}
+    stack = moves[::-1]
+    while stack:
+        move = stack.pop()
+        index.setdefault((move.sequence, move.detail_sequence), move)
+        stack.extend(reversed(move.moves))
+    return index
+
+
+def _moves_columns(statements, statement=True):
+    import numpy
+    dtype = [
+        ('amount', numpy.int64),
+        ('value_date', 'datetime64[D]'),
+        ('entry_date', 'datetime64[D]'),
+        ('transaction_code', 'U8'),
+        ('sequence', 'U4'),
+        ('detail_sequence', 'U4'),
+        ('parent', numpy.int64),
+        ]
+    if statement:
+        dtype.insert(0, ('statement', numpy.int32))
+    dtype = numpy.dtype(dtype)
+    columns = {name: [] for name in dtype.names}
+    for index, statement_ in enumerate(statements):
+        stack = [(m, -1) for m in reversed(statement_.moves)]
+        while stack:
+            move, parent = stack.pop()
+            if statement:
+                columns['statement'].append(index)
+            columns['amount'].append(int(move.amount.scaleb(3)))
+            columns['value_date'].append(move.value_date)
+            columns['entry_date'].append(move.entry_date)
+            columns['transaction_code'].append(move.transaction_code)
+            columns['sequence'].append(move.sequence)
+            columns['detail_sequence'].append(move.detail_sequence)
+            columns['parent'].append(parent)
+            parent = len(columns['parent']) - 1
+            stack.extend((m, parent) for m in reversed(move.moves))
+    table = numpy.empty(len(columns['parent']), dtype=dtype)
+    for name, values in columns.items():
+        table[name] = numpy.array(values, dtype=dtype[name])
+    return table
+
+
+class StatementSummary(_SlotsNone, _AccountMixin):
+    "The header, balances and trailer of a statement"
+    __slots__ = (list(HEADER.keys()) + list(TRAILER.keys())
+        + list(OLD_BALANCE.keys()) + list(NEW_BALANCE.keys()))
+
+
 class _TransactionMixin(object):
 
     @property
@@ -308,37 +970,212 @@ MOVE = {
 
 class Move(_SlotsNone, _Moves, _TransactionMixin):
     __slots__ = sum(
-        (list(m.keys()) for m in MOVE.values()), list(MOVE_COMMON.keys()))
+        (list(m.keys()) for m in MOVE.values()), list(MOVE_COMMON.keys())
+        + ['informations', '_structured'])
+
+    def __init__(self, *args, **kwargs):
+        super(Move, self).__init__(*args, **kwargs)
+        # filled by Statement.link_informations
+        self.informations = None
+        # filled by structured_communication
+        self._structured = None
 
     def __str__(self):
         return self.sequence + self.detail_sequence
 
+    @property
+    def structured_communication(self):
+        "The communication decoded once into a Communication"
+        structured = self._structured
+        if structured is None and self._communication is not None:
+            structured = self._structured = _decode_communication(
+                self._communication, _MOVE_COMMUNICATIONS)
+        return structured
+
     @property
     def communication(self):
-        type_ = self.communication_type
-        if type_ is None:
-            return _string(self._communication[1:])
-        elif type_ == '100':
-            # TODO ISO-11649
-            return self._communication[4:]
-        elif type_ in {'101', '102', '103'}:
-            return _string(self._communication[4:16])
-        elif type_ == '105':
-            return _string(self._communication[49:61])
-        elif type_ in {'106', '108', '111', '113', '114', '115',
-                '121', '122', '123', '124', '125', '126'}:
-            return
-        elif type_ == '127':
-            return self._communication[83:145]
-        else:
-            return self._communication[2:]
-    # TODO add parser communication
+        return self.structured_communication.communication
 
     @property
     def communication_type(self):
-        type_ = self._communication[0]
-        if type_ == '1':
-            return self._communication[1:4]
+        return self.structured_communication.type
+
+
+class _MoveStorage(object):
+    """The moves of all levels of a statement in file order
+
+    parent, child_count and last_child are indexed like moves with -1 for
+    no move and roots are the indexes of the moves of the first level.
+    The children of each move are contiguous in children from its offset,
+    they are indexed once all the moves are added.
+    """
+    __slots__ = ('moves', 'parent', 'child_count', 'last_child', 'roots',
+        '_offsets', '_children')
+
+    def __init__(self):
+        self.moves = []
+        self.parent = array('i')
+        self.child_count = array('i')
+        self.last_child = array('i')
+        self.roots = array('i')
+        self._offsets = self._children = None
+
+    def __getstate__(self):
+        return (self.moves, self.parent, self.child_count, self.last_child,
+            self.roots)
+
+    def __setstate__(self, state):
+        (self.moves, self.parent, self.child_count, self.last_child,
+            self.roots) = state
+        self._offsets = self._children = None
+
+    def append(self, move, parent):
+        "Add move as last child of the move at index parent"
+        index = len(self.moves)
+        if parent >= 0:
+            # The parent must be the last move or one of its ancestors
+            last = index - 1
+            while last > parent:
+                last = self.parent[last]
+            if last != parent:
+                raise ValueError("The moves must be added in file order")
+        move._init_flat(self, index)
+        self.moves.append(move)
+        self.parent.append(parent)
+        self.child_count.append(0)
+        self.last_child.append(-1)
+        if parent < 0:
+            self.roots.append(index)
+        else:
+            self.child_count[parent] += 1
+            self.last_child[parent] = index
+        self._offsets = self._children = None
+
+    def _index_children(self):
+        "Store the children of each move contiguously"
+        self._offsets = offsets = array(
+            'i', itertools.accumulate(self.child_count, initial=0))
+        children = array('i', [0]) * offsets[-1]
+        positions = offsets[:-1]
+        for index, parent in enumerate(self.parent):
+            if parent >= 0:
+                children[positions[parent]] = index
+                positions[parent] += 1
+        self._children = children
+
+    def children(self, index):
+        "Return the indexes of the children of the move at index"
+        if index < 0:
+            return self.roots
+        if self._offsets is None:
+            self._index_children()
+        start = self._offsets[index]
+        return self._children[start:start + self.child_count[index]]
+
+    def child(self, index, position):
+        "Return the index of the child at position of the move at index"
+        if index < 0:
+            return self.roots[position]
+        count = self.child_count[index]
+        if position < 0:
+            position += count
+        if not 0 <= position < count:
+            raise IndexError("moves index out of range")
+        if position == count - 1:
+            # The parser reads only the last child
+            return self.last_child[index]
+        if self._offsets is None:
+            self._index_children()
+        return self._children[self._offsets[index] + position]
+
+    def descendants(self, index):
+        "Yield the moves of all levels below the move at index"
+        moves, parent = self.moves, self.parent
+        # The descendants follow the move
+        for i in range(index + 1, len(moves)):
+            ancestor = parent[i]
+            while ancestor > index:
+                ancestor = parent[ancestor]
+            if ancestor != index:
+                break
+            yield moves[i]
+
+
+class _MovesView(Sequence):
+    "The list of the children of a move read from the storage"
+    __slots__ = ('_storage', '_index')
+
+    def __init__(self, storage, index):
+        self._storage = storage
+        self._index = index
+
+    def __len__(self):
+        if self._index < 0:
+            return len(self._storage.roots)
+        return self._storage.child_count[self._index]
+
+    def __getitem__(self, key):
+        moves = self._storage.moves
+        if isinstance(key, slice):
+            children = self._storage.children(self._index)
+            return [moves[i] for i in children[key]]
+        return moves[self._storage.child(self._index, key)]
+
+    def __iter__(self):
+        return map(self._storage.moves.__getitem__,
+            self._storage.children(self._index))
+
+    def __reversed__(self):
+        return map(self._storage.moves.__getitem__,
+            reversed(self._storage.children(self._index)))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, _MovesView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, move):
+        self._storage.append(move, self._index)
+
+
+class _Flat(object):
+    "Mixin reading the moves from the storage of the statement"
+    __slots__ = ()
+
+    def _init_moves(self):
+        # The moves are added to the storage through the views
+        pass
+
+    def _init_flat(self, storage, index):
+        self._storage, self._index = storage, index
+
+    @property
+    def moves(self):
+        return _MovesView(self._storage, self._index)
+
+    @property
+    def all_moves(self):
+        if self._index < 0:
+            return iter(self._storage.moves)
+        return self._storage.descendants(self._index)
+
+
+class _FlatStatement(_Flat, Statement):
+    "Statement storing its moves of all levels in a single list"
+    __slots__ = ('_storage',)
+    _index = -1
+
+    def _init_moves(self):
+        self._storage = _MoveStorage()
+
+
+class _FlatMove(_Flat, Move):
+    __slots__ = ('_storage', '_index')
 
 
 INFORMATION_COMMON = {
@@ -363,127 +1200,1239 @@ INFORMATION = {
 class Information(_SlotsNone, _TransactionMixin):
     __slots__ = sum(
         (list(m.keys()) for m in INFORMATION.values()),
-        list(INFORMATION_COMMON.keys()))
+        list(INFORMATION_COMMON.keys()) + ['_structured'])
+
+    def __init__(self, *args, **kwargs):
+        super(Information, self).__init__(*args, **kwargs)
+        # filled by structured_communication
+        self._structured = None
 
     def __str__(self):
         return self.sequence + self.detail_sequence
 
     @property
-    def communication_type(self):
-        type_ = self._communication[0]
-        if type_ == '1':
-            return self._communication[1:4]
+    def structured_communication(self):
+        "The communication decoded once into a Communication"
+        structured = self._structured
+        if structured is None and self._communication is not None:
+            structured = self._structured = _decode_communication(
+                self._communication, _INFORMATION_COMMUNICATIONS)
+        return structured
 
     @property
-    def name(self):
-        if self.communication_type in {'001', '008', '009'}:
-            return _string(self._communication[4:74])
-        else:
-            raise AttributeError
+    def communication_type(self):
+        return self.structured_communication.type
+
+
+def _communication_field(name):
+    """Return the property reading name from the structured communication
+
+    It is None if the communication is not decoded.
+    """
+    def getter(self):
+        structured = self.structured_communication
+        if structured is not None:
+            return getattr(structured, name)
+    return property(getter)
+
+
+class Information001(Information):
+    "Identification of the counterparty"
+    __slots__ = ()
+    name = _communication_field('name')
+    street = _communication_field('street')
+    locality = _communication_field('locality')
+    code_id = _communication_field('code_id')
+
+
+class Information002(Information):
+    "Communication of the bank"
+    __slots__ = ()
+    communication = _communication_field('communication')
+
+
+class Information004(Information):
+    "Counterparty's banker"
+    __slots__ = ()
+    counterparty_banker = _communication_field('counterparty_banker')
+
+
+class Information005(Information):
+    "Data concerning the correspondent"
+    __slots__ = ()
+    correspondent_data = _communication_field('correspondent_data')
+
+
+class Information006(Information):
+    "Information concerning the detail amount"
+    __slots__ = ()
+    description = _communication_field('description')
+    currency = _communication_field('currency')
+    amount = _communication_field('amount')
+    category = _communication_field('category')
+
+
+class Information007(Information):
+    "Information concerning the detail cash"
+    __slots__ = ()
+    coin_number = _communication_field('coin_number')
+    coin = _communication_field('coin')
+    total_amount = _communication_field('total_amount')
+
+
+class Information008(Information):
+    "Identification of the ultimate beneficiary (008) or ordering (009)"
+    __slots__ = ()
+    name = _communication_field('name')
+    code_id = _communication_field('code_id')
+
+
+class Information010(Information):
+    "Information pertaining to sale or purchase of securities"
+    __slots__ = ()
+    order_number = _communication_field('order_number')
+    securities_account = _communication_field('securities_account')
+    security_code_type = _communication_field('security_code_type')
+    security_code = _communication_field('security_code')
+    security_form = _communication_field('security_form')
+    quantity = _communication_field('quantity')
+    currency = _communication_field('currency')
+    price = _communication_field('price')
+    rate = _communication_field('rate')
+    name = _communication_field('name')
+    stock_exchange = _communication_field('stock_exchange')
+    transaction_date = _communication_field('transaction_date')
+    description = _communication_field('description')
+    nominal = _communication_field('nominal')
+
+
+class Information011(Information):
+    "Information pertaining to coupons"
+    __slots__ = ()
+    order_number = _communication_field('order_number')
+    securities_account = _communication_field('securities_account')
+    security_code_type = _communication_field('security_code_type')
+    security_code = _communication_field('security_code')
+    quantity = _communication_field('quantity')
+    name = _communication_field('name')
+    currency = _communication_field('currency')
+    coupon_amount = _communication_field('coupon_amount')
+    description = _communication_field('description')
+    payment_date = _communication_field('payment_date')
+
+
+# The classes of the informations by communication type, the others are
+# Information
+INFORMATION_CLASSES = {
+    '001': Information001,
+    '002': Information002,
+    '004': Information004,
+    '005': Information005,
+    '006': Information006,
+    '007': Information007,
+    '008': Information008,
+    '009': Information008,
+    '010': Information010,
+    '011': Information011,
+    }
 
-    @property
-    def street(self):
-        if self.communication_type == '001':
-            return _string(self._communication[74:109])
-        else:
-            raise AttributeError
 
-    @property
-    def locality(self):
-        if self.communication_type == '001':
-            return _string(self._communication[109:144])
-        else:
-            raise AttributeError
+def _information_type(communication):
+    "Return the communication type of the _communication of an information"
+    if communication and communication[0] == '1':
+        return communication[1:4]
 
-    @property
-    def code_id(self):
-        if self.communication_type == '001':
-            return _string(self._communication[144:179])
-        elif self.communication_type in {'008', '009'}:
-            return _string(self._communication[74:109])
-        else:
-            raise AttributeError
 
-    @property
-    def communication(self):
-        if self.communication_type == '002':
-            return self._communication[4:]
-        else:
-            raise AttributeError
+FREE_COMMUNICATION = {
+    'sequence': (slice(2, 6), str),
+    'detail_sequence': (slice(6, 10), str),
+    'text': (slice(32, 112), _string),
+    }
 
-    @property
-    def counterparty_banker(self):
-        if self.communication_type == '004':
-            return _string(self._communication[4:])
-        else:
-            raise AttributeError
 
-    @property
-    def correspondent_data(self):
-        if self.communication_type == '005':
-            return self._communication[4:]
-        else:
-            raise AttributeError
+class FreeCommunication(_SlotsNone):
+    __slots__ = list(FREE_COMMUNICATION.keys())
 
-    @property
-    def description(self):
-        if self.communication_type == '006':
-            return self._communication[4:34]
-        else:
-            raise AttributeError
 
-    @property
-    def currency(self):
-        if self.communication_type == '006':
-            return self._communication[34:37]
-        else:
-            raise AttributeError
+def _unsigned_amount(value):
+    return _amount('0' + value)
 
-    @property
-    def amount(self):
-        if self.communication_type == '006':
-            return _amount(
-                self._communication[53] + self._communication[37:52])
-        else:
-            raise AttributeError
 
-    @property
-    def category(self):
-        if self.communication_type == '006':
-            return self._communication[53:56]
-        else:
-            raise AttributeError
+def _rate(value):
+    # 4 digits and 8 decimals
+    return Decimal(value[:4] + '.' + value[4:])
 
-    @property
-    def coin_number(self):
-        if self.communication_type == '007':
-            return int(self._communication[4:11])
-        else:
-            raise AttributeError
 
-    @property
-    def coin(self):
-        if self.communication_type == '007':
-            return Decimal(self._communication[11:17]) / 1000
-        else:
-            raise AttributeError
+def _thousandths(value):
+    return Decimal(value) / 1000
 
-    @property
-    def total_amount(self):
-        if self.communication_type == '007':
-            return Decimal(self._communication[17:32]) / 1000
-        else:
-            raise AttributeError
 
-    # TODO communication type: 010 and 011
+def _signed_amount(value):
+    # The sign follows the amount
+    return _amount(value[-1] + value[:15])
 
 
-FREE_COMMUNICATION = {
-    'sequence': (slice(2, 6), str),
-    'detail_sequence': (slice(6, 10), str),
-    'text': (slice(32, 112), _string),
+def _flag(value):
+    return value == '1'
+
+
+def _ten_thousandths(value):
+    return Decimal(value) / 10000
+
+
+def _long_date(value):
+    # DDMMYYYY
+    return date(int(value[4:8]), int(value[2:4]), int(value[0:2]))
+
+
+# The structured communications of the moves by type with the slices of
+# _communication, None is the unstructured communication
+MOVE_COMMUNICATION = {
+    None: {
+        'communication': (slice(1, None), _string),
+        },
+    '100': {
+        'communication': (slice(4, None), str),
+        'reference': (slice(4, 29), _string),
+        },
+    '101': {
+        'communication': (slice(4, 16), _string),
+        },
+    '105': {
+        'amount': (slice(4, 19), _unsigned_amount),
+        'original_amount': (slice(19, 34), _unsigned_amount),
+        'rate': (slice(34, 46), _rate),
+        'currency': (slice(46, 49), str),
+        'communication': (slice(49, 61), _string),
+        'country': (slice(61, 63), _string),
+        'eur_amount': (slice(63, 78), _unsigned_amount),
+        },
+    '106': {
+        'amount': (slice(4, 19), _unsigned_amount),
+        'base_amount': (slice(19, 34), _unsigned_amount),
+        'percent': (slice(34, 46), _rate),
+        'minimum': (slice(46, 47), _flag),
+        'eur_amount': (slice(47, 62), _unsigned_amount),
+        },
+    '127': {
+        'settlement_date': (slice(4, 10), _date),
+        'direct_debit_type': (slice(10, 11), str),
+        'direct_debit_scheme': (slice(11, 12), str),
+        'paid_reason': (slice(12, 13), str),
+        'creditor_id': (slice(13, 48), _string),
+        'mandate_reference': (slice(48, 83), _string),
+        'communication': (slice(83, 145), str),
+        'r_transaction': (slice(145, 146), _string),
+        'r_reason': (slice(146, 150), _string),
+        },
+    # The types without layout and without communication
+    'text': {
+        'text': (slice(4, None), str),
+        },
+    # The other types
+    'default': {
+        'communication': (slice(2, None), str),
+        'text': (slice(4, None), str),
+        },
+    }
+INFORMATION_COMMUNICATION = {
+    None: {
+        'communication': (slice(1, None), _string),
+        },
+    '001': {
+        'name': (slice(4, 74), _string),
+        'street': (slice(74, 109), _string),
+        'locality': (slice(109, 144), _string),
+        'code_id': (slice(144, 179), _string),
+        },
+    '002': {
+        'communication': (slice(4, None), str),
+        },
+    '004': {
+        'counterparty_banker': (slice(4, None), _string),
+        },
+    '005': {
+        'correspondent_data': (slice(4, None), str),
+        },
+    '006': {
+        'description': (slice(4, 34), str),
+        'currency': (slice(34, 37), str),
+        'amount': (slice(37, 54), _signed_amount),
+        'category': (slice(53, 56), str),
+        },
+    '007': {
+        'coin_number': (slice(4, 11), int),
+        'coin': (slice(11, 17), _thousandths),
+        'total_amount': (slice(17, 32), _thousandths),
+        },
+    '008': {
+        'name': (slice(4, 74), _string),
+        'code_id': (slice(74, 109), _string),
+        },
+    '010': {
+        'order_number': (slice(4, 17), _string),
+        'securities_account': (slice(17, 45), _string),
+        'security_code_type': (slice(45, 47), str),
+        'security_code': (slice(47, 62), _string),
+        'security_form': (slice(62, 63), str),
+        'quantity': (slice(63, 75), _ten_thousandths),
+        'currency': (slice(82, 85), str),
+        'price': (slice(85, 97), _ten_thousandths),
+        'rate': (slice(97, 109), _rate),
+        'name': (slice(109, 149), _string),
+        'stock_exchange': (slice(178, 208), _string),
+        'transaction_date': (slice(208, 216), _long_date),
+        'description': (slice(216, 240), _string),
+        'nominal': (slice(240, 255), _thousandths),
+        },
+    '011': {
+        'order_number': (slice(4, 17), _string),
+        'securities_account': (slice(17, 45), _string),
+        'security_code_type': (slice(45, 47), str),
+        'security_code': (slice(47, 62), _string),
+        'quantity': (slice(62, 74), _ten_thousandths),
+        'name': (slice(74, 114), _string),
+        'currency': (slice(114, 117), str),
+        'coupon_amount': (slice(117, 129), _ten_thousandths),
+        'description': (slice(147, 177), _string),
+        'payment_date': (slice(177, 183), _date),
+        },
+    'default': {
+        'text': (slice(4, None), str),
+        },
     }
 
 
-class FreeCommunication(_SlotsNone):
-    __slots__ = list(FREE_COMMUNICATION.keys())
+class Communication(_SlotsNone):
+    """A communication decoded once
+
+    type is the type of structured communication or None.
+    """
+    __slots__ = ('type',)
+    # For the types without communication
+    communication = None
+
+    def __init__(self, type_):
+        # The other slots are all set by the parser of the type
+        self.type = type_
+
+
+class UnstructuredCommunication(Communication):
+    __slots__ = list(MOVE_COMMUNICATION[None])
+
+
+class StructuredCommunication(Communication):
+    "A structured communication without decoded layout"
+    __slots__ = list(MOVE_COMMUNICATION['text'])
+
+
+class UndecodedCommunication(StructuredCommunication):
+    "A structured communication of unknown type"
+    __slots__ = ['communication']
+
+
+class CreditorReference(Communication):
+    "ISO 11649 structured creditor reference"
+    __slots__ = list(MOVE_COMMUNICATION['100'])
+
+
+class StructuredReference(Communication):
+    "Belgian structured communication (OGM/VCS)"
+    __slots__ = list(MOVE_COMMUNICATION['101'])
+
+
+class OriginalAmount(Communication):
+    "Original amount of the transaction"
+    __slots__ = list(MOVE_COMMUNICATION['105'])
+
+
+class Calculation(Communication):
+    "Method of calculation (VAT, withholding tax, commission, etc.)"
+    __slots__ = list(MOVE_COMMUNICATION['106'])
+
+
+class SEPADirectDebit(Communication):
+    "SEPA direct debit"
+    __slots__ = list(MOVE_COMMUNICATION['127'])
+
+
+class Identification(Communication):
+    "Name, address and identification code of the counterparty"
+    __slots__ = list(INFORMATION_COMMUNICATION['001'])
+
+
+class BankCommunication(Communication):
+    __slots__ = list(INFORMATION_COMMUNICATION['002'])
+
+
+class CounterpartyBanker(Communication):
+    __slots__ = list(INFORMATION_COMMUNICATION['004'])
+
+
+class CorrespondentData(Communication):
+    __slots__ = list(INFORMATION_COMMUNICATION['005'])
+
+
+class DetailAmount(Communication):
+    "Information concerning the detail amount"
+    __slots__ = list(INFORMATION_COMMUNICATION['006'])
+
+
+class DetailCash(Communication):
+    "Information concerning the detail cash"
+    __slots__ = list(INFORMATION_COMMUNICATION['007'])
+
+
+class UltimateParty(Communication):
+    "Name and identification code of the ultimate beneficiary or ordering"
+    __slots__ = list(INFORMATION_COMMUNICATION['008'])
+
+
+class Securities(Communication):
+    "Information pertaining to sale or purchase of securities"
+    __slots__ = list(INFORMATION_COMMUNICATION['010'])
+
+
+class Coupons(Communication):
+    "Information pertaining to coupons"
+    __slots__ = list(INFORMATION_COMMUNICATION['011'])
+
+
+# Merge of a field value into an object already filled by previous articles
+_CHECK = """\
+current = obj.{field}
+if current is not None and current != value:
+    raise ValueError(
+        "Different {field} in records of %s: %r != %r" % (obj, current, value))
+obj.{field} = value"""
+_FIRST = """\
+current = obj.{field}
+if current is None:
+    obj.{field} = value
+elif current != value:
+    raise ValueError(
+        "Different {field} in articles: %r != %r" % (current, value))"""
+_CONCAT = """\
+current = obj.{field}
+if current:
+    value = current + value
+obj.{field} = value"""
+_SET = "obj.{field} = value"
+
+
+def _compile(name, *descs, encoding=None, intern=()):
+    """Return a function named name which parses a record into an object
+
+    descs are pairs of a field descriptor table and of the merge template
+    applied to each of its fields.
+    The body is unrolled once from the tables to avoid the per field loop,
+    getattr and setattr of a generic parser.
+    If encoding is set, the record is bytes and the fields are decoded
+    unless their parser accepts bytes. The encoding must be a superset of
+    ASCII like all the CODA encodings.
+    If intern is set, the function takes a dictionary as third argument to
+    share the equal values of those fields.
+    """
+    namespace = {'encoding': encoding}
+    if intern:
+        lines = ['def %s(record, obj, strings):' % name]
+    else:
+        lines = ['def %s(record, obj):' % name]
+    for desc, merge in descs:
+        for field, (slice_, parser) in desc.items():
+            lines.append(
+                '    value = record[%r:%r]' % (slice_.start, slice_.stop))
+            if encoding and parser not in _BYTES_PARSERS:
+                # ASCII has a fast decoder and most fields are ASCII
+                lines.append(
+                    '    value = (value.decode("ascii") if value.isascii() '
+                    'else value.decode(encoding))')
+            if parser is not str:
+                parser_name = 'parser_%d' % len(namespace)
+                namespace[parser_name] = parser
+                lines.append('    value = %s(value)' % parser_name)
+            if field in intern:
+                lines.append('    value = strings.setdefault(value, value)')
+            for line in merge.format(field=field).splitlines():
+                lines.append('    ' + line)
+    exec('\n'.join(lines), namespace)
+    return namespace[name]
+
+
+# The parsers accepting bytes
+_BYTES_PARSERS = {int, _date}
+
+_parse_header = _compile('_parse_header', (HEADER, _CHECK))
+_parse_old_balance = _compile('_parse_old_balance', (OLD_BALANCE, _CHECK))
+_parse_new_balance = _compile('_parse_new_balance', (NEW_BALANCE, _CHECK))
+_parse_trailer = _compile('_parse_trailer', (TRAILER, _CHECK))
+_parse_move = {
+    article: _compile(
+        '_parse_move_%s' % article, (MOVE_COMMON, _FIRST), (desc, _CONCAT))
+    for article, desc in MOVE.items()}
+_parse_information = {
+    article: _compile(
+        '_parse_information_%s' % article,
+        (INFORMATION_COMMON, _FIRST), (desc, _CONCAT))
+    for article, desc in INFORMATION.items()}
+_parse_free_communication = _compile(
+    '_parse_free_communication', (FREE_COMMUNICATION, _SET))
+
+
+def _compile_communications(tables, communications):
+    """Return the class and parser of each type of communication
+
+    communications maps the types to their class and key of tables.
+    """
+    return {
+        type_: (cls, _compile(
+                '_parse_communication_%s' % (type_ or 'unstructured'),
+                (tables[key], _SET)))
+        for type_, (cls, key) in communications.items()}
+
+
+_MOVE_COMMUNICATIONS = _compile_communications(MOVE_COMMUNICATION, {
+        None: (UnstructuredCommunication, None),
+        '100': (CreditorReference, '100'),
+        '101': (StructuredReference, '101'),
+        '102': (StructuredReference, '101'),
+        '103': (StructuredReference, '101'),
+        '105': (OriginalAmount, '105'),
+        '106': (Calculation, '106'),
+        '127': (SEPADirectDebit, '127'),
+        'default': (UndecodedCommunication, 'default'),
+        **{type_: (StructuredCommunication, 'text') for type_ in [
+                '108', '111', '113', '114', '115', '121', '122', '123',
+                '124', '125', '126']},
+        })
+_INFORMATION_COMMUNICATIONS = _compile_communications(
+    INFORMATION_COMMUNICATION, {
+        None: (UnstructuredCommunication, None),
+        '001': (Identification, '001'),
+        '002': (BankCommunication, '002'),
+        '004': (CounterpartyBanker, '004'),
+        '005': (CorrespondentData, '005'),
+        '006': (DetailAmount, '006'),
+        '007': (DetailCash, '007'),
+        '008': (UltimateParty, '008'),
+        '009': (UltimateParty, '008'),
+        '010': (Securities, '010'),
+        '011': (Coupons, '011'),
+        'default': (StructuredCommunication, 'default'),
+        })
+
+
+def _decode_communication(communication, communications):
+    if communication[0] == '1':
+        type_ = communication[1:4]
+    else:
+        type_ = None
+    try:
+        cls, parse = communications[type_]
+    except KeyError:
+        cls, parse = communications['default']
+    structured = cls(type_)
+    parse(communication, structured)
+    return structured
+
+
+class _Lazy(object):
+    "Mixin decoding the fields from the stored records on first access"
+    __slots__ = ()
+    # The index of the character of the record to find its descriptor
+    _lazy_key = 0
+    _lazy_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super(_Lazy, self).__init__(*args, **kwargs)
+        self._records = []
+
+    def __getattr__(self, name):
+        try:
+            first, descs = self._lazy_fields[name]
+        except KeyError:
+            raise AttributeError(name)
+        value = None
+        for record in self._records:
+            try:
+                slice_, parser = descs[record[self._lazy_key]]
+            except KeyError:
+                continue
+            if first:
+                value = parser(record[slice_])
+                break
+            elif value:
+                value += parser(record[slice_])
+            else:
+                value = parser(record[slice_])
+        setattr(self, name, value)
+        return value
+
+
+def _lazy_table(*descs):
+    """Return the lazy fields of the descriptor tables
+
+    descs are triplets of the record key, of the table and of whether the
+    first value is kept instead of concatenating all the values.
+    """
+    fields = {}
+    for key, desc, first in descs:
+        for name, (slice_, parser) in desc.items():
+            fields.setdefault(name, (first, {}))[1][key] = (slice_, parser)
+    return fields
+
+
+class _LazyStatement(_Lazy, Statement):
+    __slots__ = ('_records',)
+    _lazy_fields = _lazy_table(
+        ('0', HEADER, True),
+        ('1', OLD_BALANCE, True),
+        ('8', NEW_BALANCE, True),
+        ('9', TRAILER, True))
+    # The fields stored in many records
+    _repeated_fields = [
+        name for name, (_, descs) in _lazy_fields.items() if len(descs) > 1]
+
+    def _check_repeated(self):
+        "Raise ValueError if a repeated field differs between the records"
+        for name in self._repeated_fields:
+            descs = self._lazy_fields[name][1]
+            value = None
+            for record in self._records:
+                try:
+                    slice_, parser = descs[record[0]]
+                except KeyError:
+                    continue
+                current, value = value, parser(record[slice_])
+                if current is not None and current != value:
+                    raise ValueError(
+                        "Different %s in records of %s: %r != %r" % (
+                            name, self, current, value))
+
+
+class _LazyMove(_Lazy, Move):
+    __slots__ = ('_records',)
+    _lazy_key = 1
+    _lazy_fields = _lazy_table(
+        *[(a, MOVE_COMMON, True) for a in MOVE],
+        *[(a, d, False) for a, d in MOVE.items()])
+
+
+class _LazyInformation(_Lazy, Information):
+    __slots__ = ('_records',)
+    _lazy_key = 1
+    _lazy_fields = _lazy_table(
+        *[(a, INFORMATION_COMMON, True) for a in INFORMATION],
+        *[(a, d, False) for a, d in INFORMATION.items()])
+
+
+class _LazyInformation001(_LazyInformation, Information001):
+    __slots__ = ()
+
+
+class _LazyInformation002(_LazyInformation, Information002):
+    __slots__ = ()
+
+
+class _LazyInformation004(_LazyInformation, Information004):
+    __slots__ = ()
+
+
+class _LazyInformation005(_LazyInformation, Information005):
+    __slots__ = ()
+
+
+class _LazyInformation006(_LazyInformation, Information006):
+    __slots__ = ()
+
+
+class _LazyInformation007(_LazyInformation, Information007):
+    __slots__ = ()
+
+
+class _LazyInformation008(_LazyInformation, Information008):
+    __slots__ = ()
+
+
+class _LazyInformation010(_LazyInformation, Information010):
+    __slots__ = ()
+
+
+class _LazyInformation011(_LazyInformation, Information011):
+    __slots__ = ()
+
+
+_LAZY_INFORMATION_CLASSES = {
+    '001': _LazyInformation001,
+    '002': _LazyInformation002,
+    '004': _LazyInformation004,
+    '005': _LazyInformation005,
+    '006': _LazyInformation006,
+    '007': _LazyInformation007,
+    '008': _LazyInformation008,
+    '009': _LazyInformation008,
+    '010': _LazyInformation010,
+    '011': _LazyInformation011,
+    }
+
+
+def _store(record, obj):
+    obj._records.append(record)
+
+
+def _store_trailer(record, statement):
+    statement._records.append(record)
+    statement._check_repeated()
+
+
+def _store_detail(record, obj):
+    records = obj._records
+    # sequence and detail sequence must be the same for all articles
+    if records and records[0][2:10] != record[2:10]:
+        raise ValueError("Different sequences in articles: %r != %r" % (
+                records[0][2:10], record[2:10]))
+    records.append(record)
+
+
+def _fields(*descs):
+    "Return the parser of each field of the descriptor tables"
+    fields = {}
+    for desc in descs:
+        for name, (_, parser) in desc.items():
+            fields.setdefault(name, parser)
+    return fields
+
+
+def _compile_codec(name, fields):
+    """Return the functions converting the fields of an object into a tuple
+    of marshallable values and setting them back
+
+    Dates are stored as ordinals and amounts as strings.
+    """
+    namespace = {'Decimal': Decimal, 'fromordinal': date.fromordinal}
+    values, conversions = [], []
+    for field, parser in fields.items():
+        if parser is _date:
+            values.append(
+                '(None if obj.%s is None else obj.%s.toordinal())'
+                % (field, field))
+            conversions.append(
+                '    obj.%s = None if %s is None else fromordinal(%s)'
+                % (field, field, field))
+        elif parser is _amount:
+            values.append(
+                '(None if obj.%s is None else str(obj.%s))' % (field, field))
+            conversions.append(
+                '    obj.%s = None if %s is None else Decimal(%s)'
+                % (field, field, field))
+        else:
+            values.append('obj.%s' % field)
+    targets = ', '.join(
+        v if v.startswith('obj.') else f for v, f in zip(values, fields))
+    exec('\n'.join([
+                'def _encode_%s(obj):' % name,
+                '    return (%s,)' % ', '.join(values),
+                'def _decode_%s(obj, values):' % name,
+                '    %s, = values' % targets,
+                ] + conversions), namespace)
+    return namespace['_encode_' + name], namespace['_decode_' + name]
+
+
+_encode_statement, _decode_statement = _compile_codec(
+    'statement', _fields(HEADER, OLD_BALANCE, NEW_BALANCE, TRAILER))
+_encode_move, _decode_move = _compile_codec(
+    'move', _fields(MOVE_COMMON, *MOVE.values()))
+_encode_information, _decode_information = _compile_codec(
+    'information', _fields(INFORMATION_COMMON, *INFORMATION.values()))
+_INFORMATION_COMMUNICATION_INDEX = list(
+    _fields(INFORMATION_COMMON, *INFORMATION.values())).index('_communication')
+_encode_free_communication, _decode_free_communication = _compile_codec(
+    'free_communication', _fields(FREE_COMMUNICATION))
+# Incremented when the encoding of dumps changes
+_DUMPS_VERSION = 1
+
+
+def dumps(statements):
+    """Return the statements encoded as compact bytes
+
+    Only the decoded fields are stored, the lazy statements are loaded as
+    plain statements and the informations of the moves are not linked.
+    """
+    return marshal.dumps(
+        (_DUMPS_VERSION, [_dump_statement(s) for s in statements]))
+
+
+def _dump_statement(statement):
+    return (
+        _encode_statement(statement),
+        [_dump_move(m) for m in statement.moves],
+        [_encode_information(i)
+            for informations in statement.informations.values()
+            for i in informations],
+        [_encode_free_communication(f)
+            for f in statement.free_communications])
+
+
+def _dump_move(move):
+    return (_encode_move(move), [_dump_move(m) for m in move.moves])
+
+
+def loads(data):
+    "Return the list of statements encoded by dumps"
+    version, statements = marshal.loads(data)
+    if version != _DUMPS_VERSION:
+        raise ValueError("Unsupported version %r" % version)
+    return [_load_statement(s) for s in statements]
+
+
+def _load_statement(values):
+    values, moves, informations, free_communications = values
+    statement = Statement()
+    _decode_statement(statement, values)
+    statement.moves = [_load_move(m) for m in moves]
+    statement._moves_index = _index_moves(statement.moves)
+    for values in informations:
+        communication_type = _information_type(
+            values[_INFORMATION_COMMUNICATION_INDEX])
+        cls = INFORMATION_CLASSES.get(communication_type, Information)
+        information = cls.__new__(cls)
+        _decode_information(information, values)
+        information._structured = None
+        statement.informations[information.bank_reference].append(
+            information)
+        statement.informations_by_type[communication_type].append(
+            information)
+    for values in free_communications:
+        free_communication = FreeCommunication.__new__(FreeCommunication)
+        _decode_free_communication(free_communication, values)
+        statement.free_communications.append(free_communication)
+    return statement
+
+
+def _load_move(values):
+    values, moves = values
+    move = Move.__new__(Move)
+    _decode_move(move, values)
+    move.informations = move._structured = None
+    move.moves = [_load_move(m) for m in moves]
+    return move
+
+
+def _check_parent(parent, move):
+    if parent.sequence != move.sequence:
+        raise ValueError("Move %s does not have the sequence of %s" % (
+                move, parent))
+
+
+def _check_trailer(
+        statement, number_records, total_credit=None, total_debit=None):
+    if (statement.new_balance - statement.old_balance
+            != statement.total_credit - statement.total_debit):
+        raise ValueError(
+            "Balances of statement %s do not match its totals" % statement)
+    if total_credit is not None and statement.total_credit != total_credit:
+        raise ValueError("Wrong total credit of statement %s: %s != %s" % (
+                statement, statement.total_credit, total_credit))
+    if total_debit is not None and statement.total_debit != total_debit:
+        raise ValueError("Wrong total debit of statement %s: %s != %s" % (
+                statement, statement.total_debit, total_debit))
+    if statement.number_records != number_records:
+        raise ValueError(
+            "Wrong number of records of statement %s: %s != %s" % (
+                statement, statement.number_records, number_records))
+
+
+class _Parser(object):
+    Statement = Statement
+    Move = Move
+    Information = Information
+    information_classes = INFORMATION_CLASSES
+    FreeCommunication = FreeCommunication
+    MovesIndex = dict
+    parse_header = staticmethod(_parse_header)
+    parse_old_balance = staticmethod(_parse_old_balance)
+    parse_new_balance = staticmethod(_parse_new_balance)
+    parse_trailer = staticmethod(_parse_trailer)
+    parse_move = _parse_move
+    parse_information = _parse_information
+    parse_free_communication = staticmethod(_parse_free_communication)
+    # The first characters of the records and the first article
+    record_types = '0123489'
+    first_article = '1'
+    # The first character of a structured communication of information
+    structured = '1'
+    validate = 'strict'
+
+    def __init__(self):
+        # The state between calls of parse
+        self.statement = None
+        self.move = None
+        self.information = None
+        self.total_credit, self.total_debit = 0, 0
+        self.number_records = 0
+
+    def parse(self, f):
+        Statement, Move = self.Statement, self.Move
+        Information = self.Information
+        FreeCommunication = self.FreeCommunication
+        MovesIndex = self.MovesIndex
+        parse_header = self.parse_header
+        parse_old_balance = self.parse_old_balance
+        parse_new_balance = self.parse_new_balance
+        parse_trailer = self.parse_trailer
+        parse_move = self.parse_move
+        parse_information = self.parse_information
+        parse_free_communication = self.parse_free_communication
+        (HEADER_, OLD_BALANCE_, MOVE_, INFORMATION_, FREE_COMMUNICATION_,
+            NEW_BALANCE_, TRAILER_) = self.record_types
+        FIRST = self.first_article
+        STRUCTURED = self.structured
+        # The class and type of the keys of structured communication
+        information_types = {}
+        strict = self.validate == 'strict'
+        totals = self.validate != 'none'
+
+        statement = self.statement
+        if statement is not None:
+            moves_index = statement._moves_index
+        total_credit, total_debit = self.total_credit, self.total_debit
+        move = self.move
+        information = self.information
+        i = self.number_records
+        for record in f:
+            type_ = record[0]
+            if type_ == HEADER_:
+                statement = Statement()
+                statement._moves_index = moves_index = MovesIndex()
+                parse_header(record, statement)
+                # The articles can not continue those of another statement
+                move = information = None
+
+                if statement.version != 2:
+                    raise ValueError(
+                        "Unsupported version %d" % statement.version)
+            elif type_ == OLD_BALANCE_:
+                parse_old_balance(record, statement)
+                i += 1
+            elif type_ == MOVE_:
+                article = record[1]
+                if article == FIRST:
+                    move = Move()
+                elif move is None:
+                    raise ValueError(
+                        "Article without first article: %r" % record)
+                parse_move[article](record, move)
+                if article == FIRST:
+                    transaction_type = move.transaction_type
+                    if transaction_type in {'0', '1', '2', '3'}:
+                        statement.moves.append(move)
+
+                        if move.amount > 0:
+                            total_credit += move.amount
+                        else:
+                            total_debit -= move.amount
+                    elif transaction_type in {'5', '6', '7', '8'}:
+                        parent = statement.moves[-1]
+                        if strict:
+                            _check_parent(parent, move)
+                        parent.moves.append(move)
+                    elif transaction_type == '9':
+                        parent = statement.moves[-1].moves[-1]
+                        if strict:
+                            _check_parent(parent, move)
+                        parent.moves.append(move)
+                    else:
+                        raise ValueError('Unknown type: %s' % transaction_type)
+                    moves_index.setdefault(
+                        (move.sequence, move.detail_sequence), move)
+                i += 1
+            elif type_ == INFORMATION_:
+                article = record[1]
+                if article == FIRST:
+                    if record[39] == STRUCTURED:
+                        key = record[40:43]
+                        try:
+                            cls, communication_type = information_types[key]
+                        except KeyError:
+                            cls, communication_type = information_types[
+                                key] = self._information_type(key)
+                    else:
+                        cls, communication_type = Information, None
+                    information = cls()
+                elif information is None:
+                    raise ValueError(
+                        "Article without first article: %r" % record)
+                parse_information[article](record, information)
+                if article == FIRST:
+                    key = information.bank_reference
+                    statement.informations[key].append(information)
+                    statement.informations_by_type[communication_type].append(
+                        information)
+                i += 1
+            elif type_ == FREE_COMMUNICATION_:
+                free_communication = FreeCommunication()
+                parse_free_communication(record, free_communication)
+                statement.free_communications.append(free_communication)
+            elif type_ == NEW_BALANCE_:
+                parse_new_balance(record, statement)
+                i += 1
+            elif type_ == TRAILER_:
+                parse_trailer(record, statement)
+
+                if totals:
+                    _check_trailer(statement, i, total_credit, total_debit)
+                yield statement
+                statement = None
+                total_credit, total_debit = 0, 0
+                i = 0
+        self.statement = statement
+        self.move = move
+        self.information = information
+        self.total_credit, self.total_debit = total_credit, total_debit
+        self.number_records = i
+
+    def _information_type(self, key):
+        "Return the class and the communication type of the key"
+        if not isinstance(key, str):
+            key = key.decode('ascii', 'replace')
+        return self.information_classes.get(key, self.Information), key
+
+
+class _LazyParser(_Parser):
+    Statement = _LazyStatement
+    Move = _LazyMove
+    Information = _LazyInformation
+    information_classes = _LAZY_INFORMATION_CLASSES
+    parse_header = parse_old_balance = parse_new_balance = staticmethod(_store)
+    parse_trailer = staticmethod(_store_trailer)
+    parse_move = {article: _store_detail for article in MOVE}
+    parse_information = {article: _store_detail for article in INFORMATION}
+
+
+class _Discard(object):
+    "An empty container ignoring the items added"
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def append(self, item):
+        pass
+
+    def setdefault(self, key, default=None):
+        return default
+
+    def get(self, key, default=None):
+        return default
+
+
+class _EventParser(_LazyParser):
+    """Lazy parser collecting the events instead of filling the statements
+
+    The object created is the pending event until the next one is created
+    as its records follow.
+    """
+    MovesIndex = _Discard
+
+    def __init__(self):
+        super(_EventParser, self).__init__()
+        self.events = []
+        self.pending = None
+        self.Statement = self._statement
+        self.Move = functools.partial(self._emit, 'move', _LazyMove)
+        self.Information = functools.partial(
+            self._emit, 'information', _LazyInformation)
+        self.FreeCommunication = functools.partial(
+            self._emit, 'free_communication', FreeCommunication)
+
+    def _emit(self, event, cls):
+        obj = cls()
+        if self.pending is not None:
+            self.events.append(self.pending)
+        self.pending = event, obj
+        return obj
+
+    def _statement(self):
+        statement = self._emit('start_statement', _LazyStatement)
+        # Only the last move is kept as parent of the next moves
+        statement.moves = deque(maxlen=1)
+        statement.informations = _Discard()
+        statement.informations_by_type = _Discard()
+        statement.free_communications = _Discard()
+        return statement
+
+    def _information_type(self, key):
+        cls, communication_type = super(
+            _EventParser, self)._information_type(key)
+        if cls is self.Information:
+            cls = _LazyInformation
+        return (functools.partial(self._emit, 'information', cls),
+            communication_type)
+
+    def end(self, statement):
+        "Add the pending event and empty the containers of the statement"
+        if self.pending is not None:
+            self.events.append(self.pending)
+            self.pending = None
+        statement.moves = []
+        statement.informations = defaultdict(list)
+        statement.informations_by_type = defaultdict(list)
+        statement.free_communications = []
+        statement._moves_index = None
+
+
+def _lazy_parser(cls, validate):
+    "Return the lazy parser of class cls with the validation level"
+    if validate not in VALIDATIONS:
+        raise ValueError("Unknown validation: %s" % validate)
+    parser = cls()
+    parser.validate = validate
+    if validate != 'strict':
+        parser.parse_trailer = _store
+        parser.parse_move = {article: _store for article in MOVE}
+        parser.parse_information = {
+            article: _store for article in INFORMATION}
+    return parser
+
+
+# The fields needed to build and check the statements
+_REQUIRED_FIELDS = {
+    'sequence', 'detail_sequence', 'bank_reference', 'transaction_code',
+    'amount'}
+_SLOTS = set(Move.__slots__) | set(Information.__slots__)
+# The properties of Move and Information derived from _communication, the
+# names of slots (like amount) are only the slots
+_COMMUNICATION_PROPERTIES = {
+    name for cls in [Move, Information, *INFORMATION_CLASSES.values()]
+    for name, value in vars(cls).items()
+    if isinstance(value, property)} - _SLOTS
+# The properties derived from the required transaction_code
+_TRANSACTION_PROPERTIES = {
+    name for name, value in vars(_TransactionMixin).items()
+    if isinstance(value, property)}
+
+
+# The fields of moves, informations and free communications with few
+# distinct values
+_INTERNED = {
+    'sequence', 'detail_sequence', 'transaction_code', 'statement_number',
+    'counterparty_bic', 'r_transaction', 'r_reason', 'category_purpose',
+    'purpose'}
+# The levels of validation
+VALIDATIONS = ('strict', 'totals', 'none')
+
+
+@functools.lru_cache(maxsize=None)
+def _parsers(fields, encoding, validate, intern=False):
+    """Return the parsers of the records
+
+    If fields is set, the move and information parsers decode only those
+    fields. If encoding is set, the parsers are for bytes records.
+    Unless validate is strict, the repeated fields are not checked.
+    If intern is set, the move, information and free communication parsers
+    take the dictionary of the shared values.
+    """
+    interned = _INTERNED if intern else ()
+    if validate not in VALIDATIONS:
+        raise ValueError("Unknown validation: %s" % validate)
+    strict = validate == 'strict'
+    check = _CHECK if strict else _SET
+    parsers = {'validate': validate}
+    if encoding:
+        parsers['record_types'] = b'0123489'
+        parsers['first_article'] = b'1'[0]
+        parsers['structured'] = b'1'[0]
+    parsers['parse_header'] = _compile(
+        '_parse_header', (HEADER, check), encoding=encoding)
+    parsers['parse_old_balance'] = _compile(
+        '_parse_old_balance', (OLD_BALANCE, check), encoding=encoding)
+    parsers['parse_new_balance'] = _compile(
+        '_parse_new_balance', (NEW_BALANCE, check), encoding=encoding)
+    parsers['parse_trailer'] = _compile(
+        '_parse_trailer', (TRAILER, check), encoding=encoding)
+    parsers['parse_free_communication'] = _compile(
+        '_parse_free_communication', (FREE_COMMUNICATION, _SET),
+        encoding=encoding, intern=interned)
+    if fields is None:
+        fields = set(_SLOTS)
+    else:
+        fields = set(fields)
+    if fields & _COMMUNICATION_PROPERTIES:
+        fields.add('_communication')
+    unknown = (fields - _COMMUNICATION_PROPERTIES - _TRANSACTION_PROPERTIES
+        - _SLOTS)
+    if unknown:
+        raise ValueError("Unknown fields: %s" % ', '.join(sorted(unknown)))
+    fields |= _REQUIRED_FIELDS
+
+    def project(desc):
+        return {k: v for k, v in desc.items() if k in fields}
+
+    def key(article):
+        return article.encode()[0] if encoding else article
+
+    def common(article, desc):
+        # Without check, the common fields are taken from the first article
+        if strict:
+            return project(desc), _FIRST
+        elif article == '1':
+            return project(desc), _SET
+        else:
+            return {}, _SET
+    parsers['parse_move'] = {
+        key(article): _compile(
+            '_parse_move_%s' % article,
+            common(article, MOVE_COMMON), (project(desc), _CONCAT),
+            encoding=encoding, intern=interned)
+        for article, desc in MOVE.items()}
+    parsers['parse_information'] = {
+        key(article): _compile(
+            '_parse_information_%s' % article,
+            common(article, INFORMATION_COMMON), (project(desc), _CONCAT),
+            encoding=encoding, intern=interned)
+        for article, desc in INFORMATION.items()}
+    return parsers
+
+
+def _parser(
+        lazy=False, fields=None, encoding=None, validate='strict',
+        intern=False, flat=False):
+    """Return a parser of records
+
+    If encoding is set, the records are bytes decoded with it.
+    If intern is set, the parser shares the equal values of the low
+    cardinality fields (except in lazy mode).
+    If flat is set, the parser builds statements storing the moves in a
+    single list (except in lazy mode).
+    """
+    if lazy:
+        return _lazy_parser(_LazyParser, validate)
+    parser = _Parser()
+    if flat:
+        parser.Statement = _FlatStatement
+        parser.Move = _FlatMove
+    if fields is not None or encoding or validate != 'strict' or intern:
+        if fields is not None:
+            fields = frozenset(fields)
+        for name, value in _parsers(
+                fields, encoding, validate, intern).items():
+            setattr(parser, name, value)
+    if intern:
+        # The values are shared only within the parser
+        strings = {}
+
+        def bind(parse):
+            return functools.partial(parse, strings=strings)
+        parser.parse_move = {
+            k: bind(v) for k, v in parser.parse_move.items()}
+        parser.parse_information = {
+            k: bind(v) for k, v in parser.parse_information.items()}
+        parser.parse_free_communication = bind(
+            parser.parse_free_communication)
+    return parser
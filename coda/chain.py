@@ -0,0 +1,211 @@
+# This file is part of febelfin-coda.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+"""Index of the chain of statements per account
+
+The summary of each statement is appended to a file per account so the
+next statement is checked only against the last one and the statements
+already added.
+"""
+import io
+import json
+import os
+import re
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+
+from . import scan
+
+__all__ = ['ChainEntry', 'Gap', 'ChainIndex']
+
+ChainEntry = namedtuple('ChainEntry', [
+        'account', 'currency', 'old_sequence', 'new_sequence',
+        'coda_sequence', 'old_balance', 'new_balance', 'old_balance_date',
+        'new_balance_date', 'file'])
+# kind is sequence, balance or duplicate
+Gap = namedtuple('Gap', ['kind', 'previous', 'entry'])
+
+_NOT_ALPHANUMERIC = re.compile(r'[^0-9A-Za-z]')
+
+
+def _entry(statement, file=None):
+    "Return the ChainEntry of the statement or summary"
+    return ChainEntry(
+        statement.account, statement.account_currency,
+        statement.old_sequence, statement.new_sequence,
+        statement.coda_sequence, statement.old_balance,
+        statement.new_balance, statement.old_balance_date,
+        statement.new_balance_date, file)
+
+
+def _dump(entry):
+    return json.dumps([
+            entry.account, entry.currency, entry.old_sequence,
+            entry.new_sequence, entry.coda_sequence, str(entry.old_balance),
+            str(entry.new_balance), entry.old_balance_date.isoformat(),
+            entry.new_balance_date.isoformat(), entry.file])
+
+
+def _load(line):
+    (account, currency, old_sequence, new_sequence, coda_sequence,
+        old_balance, new_balance, old_balance_date, new_balance_date,
+        file) = json.loads(line)
+    return ChainEntry(
+        account, currency, old_sequence, new_sequence, coda_sequence,
+        Decimal(old_balance), Decimal(new_balance),
+        date.fromisoformat(old_balance_date),
+        date.fromisoformat(new_balance_date), file)
+
+
+def _key(entry):
+    "Return the sequences and balances identifying the statement"
+    return (entry.old_sequence, entry.new_sequence, entry.old_balance,
+        entry.new_balance)
+
+
+def _follows(previous, entry):
+    """Return whether the sequence of entry follows the previous one
+
+    The sequence restarts at 1 on a new year and after 999.
+    """
+    sequence = int(entry.old_sequence)
+    return (sequence == int(previous.new_sequence) % 999 + 1
+        or (sequence == 1 and entry.old_balance_date.year
+            > previous.new_balance_date.year))
+
+
+class ChainIndex(object):
+    """A persistent index of the summaries of statements per account
+
+    The summaries are appended to a file per account and currency in
+    directory. Each statement added is checked against the last one of its
+    account.
+    """
+    _suffix = '.chain'
+
+    def __init__(self, directory):
+        self.directory = directory
+        # The entries read by account and currency
+        self._entries = {}
+        # The entries by key per account and currency
+        self._keys = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, account, currency):
+        name = '%s-%s' % (
+            _NOT_ALPHANUMERIC.sub('_', account),
+            _NOT_ALPHANUMERIC.sub('_', currency))
+        return os.path.join(self.directory, name + self._suffix)
+
+    def entries(self, account, currency):
+        "Return the list of ChainEntry of the account in the order added"
+        key = account, currency
+        if key not in self._entries:
+            try:
+                with io.open(self._path(account, currency)) as f:
+                    entries = [_load(line) for line in f]
+            except FileNotFoundError:
+                entries = []
+            self._set_entries(key, entries)
+        return self._entries[key]
+
+    def _set_entries(self, key, entries):
+        self._entries[key] = entries
+        self._keys[key] = keys = {}
+        for entry in entries:
+            keys.setdefault(_key(entry), entry)
+
+    def last(self, account, currency):
+        "Return the last ChainEntry of the account or None"
+        entries = self.entries(account, currency)
+        if entries:
+            return entries[-1]
+
+    def check(self, statement, file=None):
+        """Return the list of Gap between the last statement and statement
+
+        statement may be a Statement or a StatementSummary.
+        The gaps are of kind:
+        - duplicate: it has the same sequences and balances as a statement
+          already added (the previous one) or it is marked as duplicate
+        - sequence: its old sequence does not follow the last new sequence
+        - balance: its old balance is not the last new balance
+        """
+        return self._check(_entry(statement, file), statement.duplicate)
+
+    def _check(self, entry, duplicate=False):
+        entries = self.entries(entry.account, entry.currency)
+        # A statement sent again is found whatever its position
+        same = self._keys[entry.account, entry.currency].get(_key(entry))
+        if same is not None or duplicate:
+            return [Gap('duplicate', same, entry)]
+        if not entries:
+            return []
+        previous = entries[-1]
+        gaps = []
+        if not _follows(previous, entry):
+            gaps.append(Gap('sequence', previous, entry))
+        if previous.new_balance != entry.old_balance:
+            gaps.append(Gap('balance', previous, entry))
+        return gaps
+
+    def add(self, statement, file=None):
+        """Append statement to the index and return its gaps
+
+        The duplicates are not appended so the statements sent again do not
+        break the chain.
+        """
+        gaps, entry = self._add(statement, file)
+        if entry is not None:
+            with io.open(
+                    self._path(entry.account, entry.currency), 'a') as f:
+                f.write(_dump(entry) + '\n')
+        return gaps
+
+    def _add(self, statement, file):
+        "Add statement to the entries and return its gaps and its entry"
+        entry = _entry(statement, file)
+        gaps = self._check(entry, statement.duplicate)
+        if any(g.kind == 'duplicate' for g in gaps):
+            return gaps, None
+        self.entries(entry.account, entry.currency).append(entry)
+        self._keys[entry.account, entry.currency][_key(entry)] = entry
+        return gaps, entry
+
+    def add_file(self, name, encoding='windows-1252'):
+        "Add the statements of the file read with scan and return the gaps"
+        gaps = []
+        for summary in scan(name, encoding=encoding):
+            gaps.extend(self.add(summary, os.fspath(name)))
+        return gaps
+
+    def rebuild(self, names, encoding='windows-1252'):
+        """Replace the index by the statements of the files
+
+        Only the headers, balances and trailers of the files are read. The
+        statements are added in the order of their new balance date and
+        sequence. Return the gaps.
+        The index is kept if a file can not be read.
+        """
+        summaries = [
+            (summary, os.fspath(name))
+            for name in names for summary in scan(name, encoding=encoding)]
+        summaries.sort(key=lambda s: (
+                s[0].new_balance_date, int(s[0].new_sequence)))
+        self.clear()
+        gaps = []
+        for summary, name in summaries:
+            gaps.extend(self._add(summary, name)[0])
+        # Each file is written at once
+        for (account, currency), entries in self._entries.items():
+            with io.open(self._path(account, currency), 'w') as f:
+                f.writelines(_dump(e) + '\n' for e in entries)
+        return gaps
+
+    def clear(self):
+        "Remove all the entries"
+        self._entries.clear()
+        self._keys.clear()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self._suffix):
+                os.remove(entry.path)
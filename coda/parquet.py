@@ -0,0 +1,161 @@
+# This file is part of febelfin-coda.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+"""Export of CODA statements to Parquet files
+
+It requires pyarrow.
+"""
+import operator
+import os
+
+import pyarrow
+import pyarrow.parquet
+
+from . import (
+    FREE_COMMUNICATION, HEADER, INFORMATION, INFORMATION_COMMON, MOVE,
+    MOVE_COMMON, NEW_BALANCE, OLD_BALANCE, TRAILER, _amount, _date, _duplicate,
+    parse_many)
+
+__all__ = ['ParquetWriter', 'write_many']
+
+_TYPES = {
+    int: pyarrow.int64(),
+    _date: pyarrow.date32(),
+    _amount: pyarrow.decimal128(18, 3),
+    _duplicate: pyarrow.bool_(),
+    }
+
+
+def _schema(tables, columns=()):
+    "Return the schema of the public fields of the descriptor tables"
+    fields = {'statement': pyarrow.int64()}
+    for table in tables:
+        for name, (_, parser) in table.items():
+            # private fields are exported through their properties
+            if not name.startswith('_'):
+                fields.setdefault(name, _TYPES.get(parser, pyarrow.string()))
+    for name in columns:
+        fields[name] = pyarrow.string()
+    return pyarrow.schema(list(fields.items()))
+
+
+SCHEMAS = {
+    'statements': _schema(
+        [HEADER, OLD_BALANCE, NEW_BALANCE, TRAILER],
+        ['account', 'account_currency', 'file']),
+    'moves': _schema(
+        [MOVE_COMMON] + list(MOVE.values()),
+        ['communication_type', 'communication', 'parent_detail_sequence']),
+    'informations': _schema(
+        [INFORMATION_COMMON] + list(INFORMATION.values()),
+        ['communication_type', 'raw_communication']),
+    'free_communications': _schema([FREE_COMMUNICATION]),
+    }
+# The columns filled by the writer instead of read from the objects
+_COLUMNS = {
+    'statement', 'file', 'communication_type', 'communication',
+    'parent_detail_sequence', 'raw_communication'}
+
+
+class ParquetWriter(object):
+    """Write statements into a Parquet file per table of directory
+
+    The tables are statements, moves, informations and free_communications.
+    The rows are linked by the statement column which numbers the
+    statements written.
+    At most batch_size rows per table are kept in memory.
+    """
+
+    def __init__(self, directory, batch_size=65536):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.statements = 0
+        self._rows = {}
+        self._getters = {}
+        self._writers = {}
+        os.makedirs(directory, exist_ok=True)
+        for table, schema in SCHEMAS.items():
+            self._rows[table] = []
+            self._getters[table] = operator.attrgetter(*(
+                    n for n in schema.names if n not in _COLUMNS))
+            self._writers[table] = pyarrow.parquet.ParquetWriter(
+                os.path.join(directory, table + '.parquet'), schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def write(self, statement, file=None):
+        "Add the statement read from file"
+        index = self.statements
+        self.statements += 1
+        self._add('statements',
+            (index,) + self._getters['statements'](statement) + (file,))
+        get_move = self._getters['moves']
+        stack = [(m, None) for m in reversed(statement.moves)]
+        while stack:
+            move, parent = stack.pop()
+            self._add('moves', (index,) + get_move(move)
+                + _communication(move, 'communication') + (parent,))
+            stack.extend(
+                (m, move.detail_sequence) for m in reversed(move.moves))
+        get_information = self._getters['informations']
+        for informations in statement.informations.values():
+            for information in informations:
+                self._add('informations',
+                    (index,) + get_information(information)
+                    + _communication(information, '_communication'))
+        get_free_communication = self._getters['free_communications']
+        for free_communication in statement.free_communications:
+            self._add('free_communications',
+                (index,) + get_free_communication(free_communication))
+
+    def _add(self, table, row):
+        rows = self._rows[table]
+        rows.append(row)
+        if len(rows) >= self.batch_size:
+            self._flush(table)
+
+    def _flush(self, table):
+        rows = self._rows[table]
+        if rows:
+            schema = SCHEMAS[table]
+            batch = pyarrow.RecordBatch.from_arrays(
+                [pyarrow.array(c, type=f.type)
+                    for c, f in zip(zip(*rows), schema)],
+                schema=schema)
+            self._writers[table].write_batch(batch)
+            rows.clear()
+
+    def close(self):
+        "Write the remaining rows and close the files"
+        for table, writer in self._writers.items():
+            self._flush(table)
+            writer.close()
+
+
+def _communication(obj, name):
+    "Return the communication type and communication unless not decoded"
+    if obj._communication is None:
+        return None, None
+    return obj.communication_type, getattr(obj, name)
+
+
+def write_many(names, directory, workers=None, batch_size=65536, **kwargs):
+    """Parse the files with parse_many and write their statements to directory
+
+    Return the dictionary of the names which failed to parse with their
+    exception.
+    The other keyword arguments are passed to parse_many.
+    """
+    errors = {}
+    with ParquetWriter(directory, batch_size=batch_size) as writer:
+        for name, result in parse_many(
+                names, workers=workers, ordered=False, **kwargs):
+            if isinstance(result, Exception):
+                errors[name] = result
+                continue
+            for statement in result.statements:
+                writer.write(statement, os.fspath(name))
+    return errors
@@ -0,0 +1,127 @@
+# This file is part of febelfin-coda.  The COPYRIGHT file at the top level of
+# this repository contains the full copyright notices and license terms.
+"""Matching of the moves of CODA statements with open items
+
+The open items (like unpaid invoices) are indexed once by Belgian
+structured reference (OGM/VCS), by ISO 11649 creditor reference and by
+amount with date.
+"""
+import re
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+__all__ = ['OpenItem', 'Match', 'Reconciler']
+
+OpenItem = namedtuple('OpenItem',
+    ['id', 'amount', 'reference', 'date', 'counterparty_account'],
+    defaults=[None, None, None])
+# items is the tuple of the matching open items, empty if method is None
+Match = namedtuple('Match', ['move', 'items', 'method'])
+
+_NOT_DIGITS = re.compile(r'\D')
+_NOT_ALPHANUMERIC = re.compile(r'[^0-9A-Z]')
+
+
+def _structured_reference(value):
+    "Return the 12 digits of a valid structured reference or None"
+    digits = value if value.isdigit() else _NOT_DIGITS.sub('', value)
+    if len(digits) == 12 and (int(digits[:10]) % 97 or 97) == int(digits[10:]):
+        return digits
+
+
+def _creditor_reference(value):
+    "Return the compact form of a valid ISO 11649 reference or None"
+    reference = _NOT_ALPHANUMERIC.sub('', value.upper())
+    if (reference.startswith('RF') and 5 <= len(reference) <= 25
+            and int(''.join(
+                    str(int(c, 36)) for c in reference[4:] + reference[:4]))
+            % 97 == 1):
+        return reference
+
+
+def _account(value):
+    if value:
+        return _NOT_ALPHANUMERIC.sub('', value.upper())
+
+
+class Reconciler(object):
+    """Index of open items to match with the moves
+
+    The items have the attributes of OpenItem: amount, reference, date and
+    counterparty_account (the last three may be None). The amount is signed
+    like those of the moves.
+    days is the number of days around the value date of the moves to
+    search the items with the same amount. The items without date match
+    any value date.
+    """
+
+    def __init__(self, items=(), days=0):
+        self.days = days
+        self._structured_references = defaultdict(list)
+        self._creditor_references = defaultdict(list)
+        self._amounts = defaultdict(list)
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        "Add the open item to the indexes"
+        if item.reference:
+            reference = _structured_reference(item.reference)
+            if reference:
+                self._structured_references[reference].append(item)
+            else:
+                reference = _creditor_reference(item.reference)
+                if reference:
+                    self._creditor_references[reference].append(item)
+        if item.amount is not None:
+            self._amounts[item.amount, item.date].append(item)
+
+    def match(self, statements):
+        """Return the list of Match of the moves of all levels
+
+        The moves are matched first by their structured or creditor
+        reference. The others are matched by amount and value date, the
+        items of the same counterparty account are preferred.
+        """
+        structured_references = self._structured_references
+        creditor_references = self._creditor_references
+        # The nearest dates first
+        dates = [timedelta(days) for days in sorted(
+                range(-self.days, self.days + 1), key=abs)]
+        matches = []
+        for statement in statements:
+            for move in statement.all_moves:
+                items, method = (), None
+                communication = move.structured_communication
+                if communication is None:
+                    pass
+                elif communication.type == '101':
+                    items = structured_references.get(
+                        communication.communication, ())
+                    method = 'structured_reference'
+                elif communication.type == '100':
+                    reference = _creditor_reference(communication.reference)
+                    if reference:
+                        items = creditor_references.get(reference, ())
+                        method = 'creditor_reference'
+                if not items:
+                    items = self._match_amount(move, dates)
+                    method = 'amount'
+                matches.append(
+                    Match(move, tuple(items), method if items else None))
+        return matches
+
+    def _match_amount(self, move, dates):
+        amounts = self._amounts
+        value_date = move.value_date
+        items = []
+        for delta in dates:
+            items.extend(amounts.get((move.amount, value_date + delta), ()))
+        items.extend(amounts.get((move.amount, None), ()))
+        if len(items) > 1:
+            account = _account(move.counterparty_account)
+            same = [i for i in items
+                if account and _account(i.counterparty_account) == account]
+            if same:
+                items = same
+        return items
@@ -3,12 +3,38 @@
 # this repository contains the full copyright notices and license terms.
 """Test MT940
 """
+import asyncio
+import copy
+import marshal
 import os
+import pickle
+import tempfile
 import unittest
-from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
-from coda import CODA
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import pyarrow.parquet
+
+    from coda.parquet import ParquetWriter, write_many
+except ImportError:
+    pyarrow = None
+
+from coda import (
+    CODA, VALIDATIONS, Calculation, CODAParser, Coupons, CreditorReference,
+    DetailAmount, DetailCash, Identification, Information, Information001,
+    Information007, Information010, Information011, Move, OriginalAmount,
+    ParseCache, Securities, SEPADirectDebit, Statement,
+    StructuredCommunication, StructuredReference, UndecodedCommunication,
+    UnstructuredCommunication, _amount, _date, aiter_statements, dumps,
+    iter_events, iter_statements, loads, merge_moves, parse_many, scan)
+from coda.chain import ChainIndex
+from coda.reconcile import OpenItem, Reconciler
 
 here = os.path.dirname(__file__)
 
@@ -124,6 +150,28 @@ class TestCODA(unittest.TestCase):
         self.assertEqual(move.sequence, '0041')
         self.assertEqual(move.detail_sequence, '0001')
 
+    def test_statement_find_missing(self):
+        self.assertIsNone(self.statement.find_move('9999', '0000'))
+
+    def test_statement_find_without_index(self):
+        "Test find_move on statement not created by the parser"
+        statement = Statement()
+        statement.moves.extend(self.statement.moves)
+
+        move = statement.find_move('0041', '0001')
+
+        self.assertEqual(str(move), '00410001')
+
+    def test_statement_link_informations(self):
+        self.statement.link_informations()
+
+        move = self.get_move('0007', '0001')
+        information, = move.informations
+        self.assertEqual(str(information), '00070002')
+        self.assertEqual(
+            sum(len(m.informations) for m in self.statement.all_moves),
+            sum(len(i) for i in self.statement.informations.values()))
+
     def test_moves(self):
         self.assertEqual(len(list(self.statement.moves)), 59)
 
@@ -320,3 +368,1630 @@ class TestCODA(unittest.TestCase):
         amount = sum(m.amount for m in move.moves)
 
         self.assertEqual(amount, move.amount)
+
+    def test_structured_communication_cached(self):
+        move = self.get_move('0053', '0000')
+
+        self.assertIs(
+            move.structured_communication, move.structured_communication)
+
+    def test_structured_communication_unstructured(self):
+        communication = self.get_move('0001', '0000').structured_communication
+
+        self.assertIsInstance(communication, UnstructuredCommunication)
+        self.assertIsNone(communication.type)
+
+    def test_structured_communication_101(self):
+        communication = self.get_move('0053', '0000').structured_communication
+
+        self.assertIsInstance(communication, StructuredReference)
+        self.assertEqual(communication.type, '101')
+        self.assertEqual(communication.communication, '269021157996')
+
+    def test_pickle_undecoded_communication(self):
+        "Test pickling a decoded communication of a subclass of subclass"
+        move = self.get_move('0048', '0000')
+        communication = move.structured_communication
+        self.assertIsInstance(communication, UndecodedCommunication)
+
+        other = pickle.loads(pickle.dumps(move))
+
+        self.assertEqual(other.communication_type, '107')
+        self.assertEqual(other.communication, move.communication)
+        self.assertEqual(
+            pickle.loads(pickle.dumps(communication)).communication,
+            communication.communication)
+
+    def test_structured_communication_105(self):
+        communication = self.get_move('0003', '0002').structured_communication
+
+        self.assertIsInstance(communication, OriginalAmount)
+        self.assertEqual(communication.amount, Decimal('1075'))
+        self.assertEqual(communication.original_amount, Decimal('1075'))
+        self.assertEqual(communication.rate, Decimal(1))
+        self.assertEqual(communication.currency, 'EUR')
+        self.assertEqual(communication.eur_amount, Decimal('1075'))
+
+    def test_structured_communication_106(self):
+        communication = self.get_move('0004', '0003').structured_communication
+
+        self.assertIsInstance(communication, Calculation)
+        self.assertEqual(communication.amount, Decimal('5.36'))
+        self.assertEqual(communication.base_amount, Decimal('25.5'))
+        self.assertEqual(communication.percent, Decimal(21))
+        self.assertIs(communication.minimum, False)
+        self.assertIsNone(communication.communication)
+
+    def test_structured_communication_without_layout(self):
+        communication = self.get_move('0048', '0000').structured_communication
+
+        self.assertIsInstance(communication, UndecodedCommunication)
+        self.assertEqual(communication.type, '107')
+        self.assertTrue(communication.text.startswith('740316'))
+
+    def test_information_structured_communication_001(self):
+        communication = self.get_information(
+            '0003', '0001').structured_communication
+
+        self.assertIsInstance(communication, Identification)
+        self.assertEqual(communication.name, 'Olgerdin Egill Skallagrims')
+        self.assertEqual(communication.locality, '11110 Reykjavik')
+
+    def test_information_structured_communication_007(self):
+        information = self.get_information('0049', '0001')
+        communication = information.structured_communication
+
+        self.assertIsInstance(communication, DetailCash)
+        self.assertEqual(communication.coin_number, 1)
+        self.assertEqual(communication.total_amount, Decimal(10))
+        with self.assertRaises(AttributeError):
+            information.name
+
+    def test_information_structured_communication_010(self):
+        information = self.get_information('0028', '0001')
+        communication = information.structured_communication
+
+        self.assertIsInstance(information, Information010)
+        self.assertIsInstance(communication, Securities)
+        self.assertEqual(communication.order_number, 'EO767357')
+        self.assertEqual(communication.security_code, 'XS0271580481')
+        self.assertEqual(communication.currency, 'EUR')
+        self.assertEqual(communication.price, Decimal('100.05'))
+        self.assertEqual(communication.rate, Decimal(1))
+        self.assertEqual(
+            information.name, 'PEMBRIDGE SQ CDO CL F  06 VAR 070117')
+        self.assertEqual(information.transaction_date, date(2006, 10, 20))
+        self.assertEqual(information.description, 'intekening')
+        self.assertEqual(information.nominal, Decimal(2500000))
+
+    def test_information_structured_communication_011(self):
+        information = self.get_information('0051', '0001')
+        communication = information.structured_communication
+
+        self.assertIsInstance(information, Information011)
+        self.assertIsInstance(communication, Coupons)
+        self.assertEqual(communication.security_code, 'US92343V1044')
+        self.assertEqual(communication.quantity, Decimal(850))
+        self.assertEqual(information.name, 'VERIZON COMMUNICATIONS ACTION')
+        self.assertEqual(information.currency, 'USD')
+        self.assertEqual(information.coupon_amount, Decimal('0.405'))
+        self.assertEqual(information.payment_date, date(2006, 11, 1))
+
+    def test_information_class(self):
+        information = self.get_information('0003', '0001')
+
+        self.assertIsInstance(information, Information001)
+        self.assertEqual(information.name, 'Olgerdin Egill Skallagrims')
+        self.assertFalse(hasattr(information, 'coin'))
+
+    def test_information_class_unstructured(self):
+        information, = self.statement.informations_by_type[None]
+
+        self.assertIs(information.communication_type, None)
+        self.assertFalse(hasattr(information, 'name'))
+
+    def test_informations_by_type(self):
+        informations = [
+            i for v in self.statement.informations.values() for i in v]
+        by_type = self.statement.informations_by_type
+
+        self.assertEqual(
+            set(by_type), {None, '001', '004', '007', '010', '011'})
+        self.assertEqual(sum(map(len, by_type.values())), len(informations))
+        for type_, informations in by_type.items():
+            for information in informations:
+                self.assertEqual(information.communication_type, type_)
+        self.assertTrue(
+            all(isinstance(i, Information007) for i in by_type['007']))
+
+
+class TestCommunication(unittest.TestCase):
+    "Test the structured communications missing from the sample"
+
+    def move(self, communication):
+        move = Move()
+        move._communication = communication
+        return move.structured_communication
+
+    def information(self, communication):
+        information = Information()
+        information._communication = communication
+        return information.structured_communication
+
+    def test_100(self):
+        communication = self.move('1100RF18539007547034'.ljust(150))
+
+        self.assertIsInstance(communication, CreditorReference)
+        self.assertEqual(communication.reference, 'RF18539007547034')
+
+    def test_127(self):
+        communication = self.move((
+                '1127' '070322' '1' '0' '0' + 'BE68ZZZ0123456789'.ljust(35)
+                + 'MANDATE-1'.ljust(35) + 'Invoice 42'.ljust(62)
+                + 'R' 'AC01').ljust(150))
+
+        self.assertIsInstance(communication, SEPADirectDebit)
+        self.assertEqual(communication.settlement_date, date(2022, 3, 7))
+        self.assertEqual(communication.creditor_id, 'BE68ZZZ0123456789')
+        self.assertEqual(communication.mandate_reference, 'MANDATE-1')
+        self.assertEqual(communication.communication.rstrip(), 'Invoice 42')
+        self.assertEqual(communication.r_transaction, 'R')
+        self.assertEqual(communication.r_reason, 'AC01')
+
+    def test_006(self):
+        communication = self.information((
+                '1006' + 'Fees'.ljust(30) + 'EUR' + '000000000012500'
+                + '11' '23').ljust(74))
+
+        self.assertIsInstance(communication, DetailAmount)
+        self.assertEqual(communication.description.rstrip(), 'Fees')
+        self.assertEqual(communication.currency, 'EUR')
+        self.assertEqual(communication.amount, Decimal('-12.5'))
+
+    def test_unknown(self):
+        communication = self.information('1099text'.ljust(74))
+
+        self.assertIsInstance(communication, StructuredCommunication)
+        self.assertEqual(communication.text.rstrip(), 'text')
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'))
+        self.statement, = self.coda.statements
+
+    def test_to_columns(self):
+        table = self.statement.to_columns()
+        moves = list(self.statement.all_moves)
+
+        self.assertEqual(len(table), len(moves))
+        self.assertEqual(
+            table['amount'].tolist(), [m.amount * 1000 for m in moves])
+        self.assertEqual(
+            table['value_date'].astype(object).tolist(),
+            [m.value_date for m in moves])
+        self.assertEqual(
+            table['transaction_code'].tolist(),
+            [m.transaction_code for m in moves])
+        self.assertNotIn('statement', table.dtype.names)
+
+    def test_to_columns_parent(self):
+        table = self.statement.to_columns()
+        moves = list(self.statement.all_moves)
+
+        for move, parent in zip(moves, table['parent']):
+            if parent >= 0:
+                self.assertIn(move, moves[parent].moves)
+            else:
+                self.assertIn(move, self.statement.moves)
+
+    def test_to_columns_balance(self):
+        table = self.statement.to_columns()
+
+        self.assertEqual(
+            table['amount'][table['parent'] == -1].sum(),
+            (self.statement.new_balance - self.statement.old_balance) * 1000)
+
+    def test_moves_table(self):
+        table = self.coda.moves_table()
+
+        self.assertEqual(set(table['statement']), {0})
+        self.assertEqual(len(table), len(list(self.statement.all_moves)))
+
+
+class TestCODALazy(TestCODA):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'), lazy=True)
+
+    def test_move_not_decoded(self):
+        "Test fields are decoded on first access"
+        with self.assertRaises(AttributeError):
+            Move.value_date.__get__(self.move)
+
+        self.assertEqual(self.move.value_date, date(2006, 12, 6))
+        self.assertEqual(Move.value_date.__get__(self.move), date(2006, 12, 6))
+
+    def test_move_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            self.move.foo
+
+
+class TestCODATotals(TestCODA):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'), validate='totals')
+
+
+class TestCODANone(TestCODA):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'), validate='none')
+
+
+class TestValidate(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            self.records = f.readlines()
+
+    def wrong_sequence(self):
+        records = list(self.records)
+        records[3] = records[3][:2] + '9999' + records[3][6:]
+        return records
+
+    def wrong_total(self):
+        records = list(self.records)
+        records[-1] = records[-1][:30] + '9' + records[-1][31:]
+        return records
+
+    def wrong_account(self):
+        "Return the records with another account in the new balance"
+        records = list(self.records)
+        records[-2] = records[-2][:10] + '9' + records[-2][11:]
+        return records
+
+    def test_strict(self):
+        for records in [
+                self.wrong_sequence(), self.wrong_total(),
+                self.wrong_account()]:
+            for lazy in [False, True]:
+                with self.subTest(lazy=lazy), \
+                        self.assertRaises(ValueError):
+                    CODA(records, lazy=lazy, validate='strict')
+
+    def test_totals(self):
+        for lazy in [False, True]:
+            with self.subTest(lazy=lazy):
+                CODA(self.wrong_sequence(), lazy=lazy, validate='totals')
+                CODA(self.wrong_account(), lazy=lazy, validate='totals')
+                with self.assertRaises(ValueError):
+                    CODA(self.wrong_total(), lazy=lazy, validate='totals')
+
+    def test_none(self):
+        for records in [
+                self.wrong_sequence(), self.wrong_total(),
+                self.wrong_account()]:
+            for lazy in [False, True]:
+                with self.subTest(lazy=lazy):
+                    CODA(records, lazy=lazy, validate='none')
+
+    def test_missing_trailer(self):
+        "Test the missing trailer is raised at every level"
+        for validate in VALIDATIONS:
+            for lazy in [False, True]:
+                with self.subTest(validate=validate, lazy=lazy), \
+                        self.assertRaisesRegex(
+                            ValueError, "Missing trailer record"):
+                    CODA(self.records[:-1], lazy=lazy, validate=validate)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            CODA(self.records, validate='foo')
+
+
+class TestCODABinary(TestCODA):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'), binary=True)
+
+    def test_buffer(self):
+        "Test parsing a buffer with Windows newlines"
+        with open(os.path.join(here, 'CODA.txt'), 'rb') as f:
+            data = f.read().replace(b'\n', b'\r\n')
+
+        coda = CODA(memoryview(data))
+
+        statement, = coda.statements
+        self.assertEqual(statement.new_balance, self.statement.new_balance)
+        self.assertEqual(
+            [m.communication for m in statement.all_moves],
+            [m.communication for m in self.statement.all_moves])
+
+    def test_bytes(self):
+        "Test parsing bytes content and a bytes path"
+        path = os.path.join(here, 'CODA.txt')
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        for name in [memoryview(data), os.fsencode(path)]:
+            with self.subTest(name=type(name)):
+                statement, = CODA(name, binary=True).statements
+                self.assertEqual(
+                    [m.communication for m in statement.all_moves],
+                    [m.communication for m in self.statement.all_moves])
+
+    def test_newlines(self):
+        "Test the newlines are translated like text mode"
+        with open(os.path.join(here, 'CODA.txt'), 'rb') as f:
+            data = f.read()
+
+        for newline in [b'\r', b'\r\n']:
+            lines = data.replace(b'\n', newline)
+            for buffer in [bytearray(lines), memoryview(lines)]:
+                with self.subTest(newline=newline, buffer=type(buffer)):
+                    statement, = CODA(buffer).statements
+                    self.assertEqual(len(list(statement.all_moves)), 111)
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'CODA.txt')
+                with open(path, 'wb') as f:
+                    f.write(lines)
+                with self.subTest(newline=newline, buffer='file'):
+                    statement, = CODA(path, binary=True).statements
+                    self.assertEqual(
+                        [m.communication for m in statement.all_moves],
+                        [m.communication for m in self.statement.all_moves])
+
+
+class TestCODAIntern(TestCODA):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'), intern=True)
+
+    def test_shared(self):
+        "Test equal values are the same object"
+        moves = list(self.coda.statements[0].all_moves)
+
+        for name in ['detail_sequence', 'transaction_code',
+                'statement_number']:
+            values = {}
+            for move in moves:
+                value = getattr(move, name)
+                self.assertIs(values.setdefault(value, value), value)
+
+    def test_not_shared(self):
+        "Test values are not shared without intern"
+        moves = list(
+            CODA(os.path.join(here, 'CODA.txt')).statements[0].all_moves)
+
+        self.assertIsNot(moves[0].statement_number, moves[1].statement_number)
+
+    def test_session(self):
+        "Test values are not shared between parsings"
+        other = CODA(os.path.join(here, 'CODA.txt'), intern=True)
+
+        self.assertIsNot(
+            self.coda.statements[0].moves[0].statement_number,
+            other.statements[0].moves[0].statement_number)
+
+    def test_binary(self):
+        coda = CODA(os.path.join(here, 'CODA.txt'), binary=True, intern=True)
+
+        first, second = coda.statements[0].moves[:2]
+        self.assertIs(first.statement_number, second.statement_number)
+
+    def test_parser(self):
+        parser = CODAParser(intern=True)
+        with open(os.path.join(here, 'CODA.txt'), 'rb') as f:
+            statements = parser.feed(f.read()) + parser.close()
+
+        first, second = statements[0].moves[:2]
+        self.assertIs(first.statement_number, second.statement_number)
+
+
+class TestCODAFlat(TestCODA):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'), flat=True)
+
+    def test_all_moves(self):
+        "Test all moves are in the same order as nested"
+        nested = CODA(os.path.join(here, 'CODA.txt')).statements[0]
+
+        self.assertEqual(
+            [str(m) for m in self.statement.all_moves],
+            [str(m) for m in nested.all_moves])
+        for move, expected in zip(
+                self.statement.all_moves, nested.all_moves):
+            self.assertEqual(
+                [str(m) for m in move.moves],
+                [str(m) for m in expected.moves])
+            self.assertEqual(
+                [str(m) for m in move.all_moves],
+                [str(m) for m in expected.all_moves])
+
+    def test_view(self):
+        "Test the moves behave like a list"
+        moves = list(self.statement.moves)
+
+        self.assertEqual(len(self.statement.moves), len(moves))
+        self.assertIs(self.statement.moves[-1], moves[-1])
+        self.assertEqual(self.statement.moves[1:3], moves[1:3])
+        self.assertEqual(list(reversed(self.statement.moves)), moves[::-1])
+        self.assertEqual(self.statement.moves, moves)
+        self.assertIn(moves[2], self.statement.moves)
+        self.assertEqual(self.statement.moves.index(moves[2]), 2)
+        self.assertEqual(self.get_move('0001', '0000').moves, [])
+
+    def test_file_order(self):
+        "Test appending a move out of file order"
+        move = self.move.moves[0] if self.move.moves else self.move
+
+        with self.assertRaises(ValueError):
+            move.moves.append(type(move)())
+
+    def test_set_moves(self):
+        for moves in [[Move()], []]:
+            with self.subTest(moves=moves), \
+                    self.assertRaises(AttributeError):
+                self.move.moves = moves
+
+    def test_index_children(self):
+        "Test the children are indexed like the nested moves"
+        nested = CODA(os.path.join(here, 'CODA.txt')).statements[0]
+
+        for move, expected in zip(
+                self.statement.all_moves, nested.all_moves):
+            for i in range(-len(expected.moves), len(expected.moves)):
+                self.assertEqual(str(move.moves[i]), str(expected.moves[i]))
+            with self.assertRaises(IndexError):
+                move.moves[len(expected.moves)]
+
+    def test_pickle(self):
+        statement = pickle.loads(pickle.dumps(self.statement))
+
+        self.assertIsInstance(statement, type(self.statement))
+        self.assertEqual(
+            [str(m) for m in statement.all_moves],
+            [str(m) for m in self.statement.all_moves])
+        self.assertEqual(
+            statement.find_move('0002', '0001').amount,
+            self.get_move('0002', '0001').amount)
+        self.assertEqual(
+            len(copy.deepcopy(self.statement).moves),
+            len(self.statement.moves))
+
+    def test_dumps(self):
+        "Test dumps loads nested moves"
+        statement, = loads(dumps([self.statement]))
+
+        self.assertEqual(
+            [str(m) for m in statement.all_moves],
+            [str(m) for m in self.statement.all_moves])
+
+    def test_lazy(self):
+        "Test flat does not apply to lazy mode"
+        coda = CODA(os.path.join(here, 'CODA.txt'), lazy=True, flat=True)
+
+        self.assertIsInstance(coda.statements[0].moves, list)
+
+
+class TestCODAFields(unittest.TestCase):
+
+    def setUp(self):
+        self.coda = CODA(
+            os.path.join(here, 'CODA.txt'), fields=['communication'])
+
+    @property
+    def statement(self):
+        return self.coda.statements[0]
+
+    def test_statement(self):
+        self.assertEqual(self.statement.account, '435000000080')
+        self.assertEqual(len(self.statement.moves), 59)
+        self.assertEqual(len(self.statement.informations), 22)
+
+    def test_move_required(self):
+        move = self.statement.moves[0]
+
+        self.assertEqual(move.amount, Decimal('-2578.25'))
+        self.assertEqual(move.transaction_code, '00799000')
+
+    def test_move_projected(self):
+        move = self.statement.find_move('0053', '0000')
+
+        self.assertEqual(move.communication_type, '101')
+        self.assertEqual(move.communication, '269021157996')
+
+    def test_move_not_projected(self):
+        move = self.statement.moves[0]
+
+        self.assertIsNone(move.value_date)
+        self.assertIsNone(move.counterparty_name)
+
+    def test_unknown_fields(self):
+        with self.assertRaises(ValueError):
+            CODA(os.path.join(here, 'CODA.txt'), fields=['foo'])
+
+    def test_inherited_property(self):
+        coda = CODA(
+            os.path.join(here, 'CODA.txt'), fields=['transaction_family'])
+        move = coda.statements[0].moves[0]
+
+        self.assertEqual(move.transaction_family, '07')
+        self.assertIsNone(move.value_date)
+        self.assertIsNone(move._communication)
+
+    def test_slot_not_communication(self):
+        "Test the slots named like communication fields do not decode it"
+        coda = CODA(
+            os.path.join(here, 'CODA.txt'), fields=['amount', 'value_date'])
+        statement = coda.statements[0]
+        move = statement.moves[0]
+        information = statement.informations_by_type['007'][0]
+
+        self.assertEqual(move.amount, Decimal('-2578.25'))
+        self.assertIsNone(move._communication)
+        self.assertIsNone(information._communication)
+        self.assertIsNone(information.coin)
+
+
+class TestIterStatements(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            self.records = f.readlines()
+
+    def test_iter_statements_path(self):
+        statements = iter_statements(os.path.join(here, 'CODA.txt'))
+
+        statement, = statements
+        self.assertEqual(len(statement.moves), 59)
+
+    def test_iter_statements_lazy(self):
+        "Test statements are yielded at their trailer"
+        consumed = []
+
+        def records():
+            for record in self.records * 2:
+                consumed.append(record)
+                yield record
+
+        statements = iter_statements(records())
+        next(statements)
+
+        self.assertEqual(len(consumed), len(self.records))
+        self.assertEqual(len(list(statements)), 1)
+
+    def test_iter_statements_wrong_total(self):
+        "Test wrong trailer total is detected"
+        records = list(self.records)
+        records[-1] = records[-1][:30] + '9' + records[-1][31:]
+
+        with self.assertRaises(ValueError):
+            list(iter_statements(records))
+
+    def test_iter_statements_wrong_sequence(self):
+        "Test sequence mismatch between articles is detected"
+        records = list(self.records)
+        records[3] = records[3][:2] + '9999' + records[3][6:]
+
+        with self.assertRaises(ValueError):
+            list(iter_statements(records))
+
+    def test_iter_statements_missing_trailer(self):
+        "Test truncated file is detected"
+        records = self.records[:-1]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'CODA.txt')
+            with open(path, 'w', encoding='windows-1252') as f:
+                f.writelines(records)
+
+            for name, kwargs in [
+                    (records, {}),
+                    (path, {}),
+                    (path, {'lazy': True}),
+                    (path, {'binary': True}),
+                    (path, {'workers': 1}),
+                    ]:
+                with self.subTest(name=name, **kwargs):
+                    with self.assertRaisesRegex(
+                            ValueError, "Missing trailer record"):
+                        list(iter_statements(name, **kwargs))
+
+
+class TestDecoders(unittest.TestCase):
+
+    def test_date(self):
+        for year in range(100):
+            for value in ['0101%02d' % year, '3112%02d' % year]:
+                with self.subTest(value=value):
+                    self.assertEqual(
+                        _date(value),
+                        datetime.strptime(value, '%d%m%y').date())
+
+    def test_date_invalid(self):
+        with self.assertRaises(ValueError):
+            _date('300206')
+
+    def test_amount(self):
+        for value, result in [
+                ('0000000002578250', '2578.25'),
+                ('1000000002578250', '-2578.25'),
+                ('0000000001000000', '1000'),
+                ('0000000000000001', '0.001'),
+                ('0000000000000000', '0'),
+                ('1000000000000000', '-0'),
+                ]:
+            with self.subTest(value=value):
+                amount = _amount(value)
+                self.assertEqual(repr(amount), repr(Decimal(result)))
+
+
+class TestCODAParser(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(here, 'CODA.txt'), 'rb') as f:
+            self.data = f.read()
+
+    def test_feed_chunks(self):
+        "Test feeding chunks split inside records and newlines"
+        data = self.data.replace(b'\n', b'\r\n') * 2
+        parser = CODAParser()
+
+        statements = []
+        for i in range(0, len(data), 129):
+            statements.extend(parser.feed(data[i:i + 129]))
+        statements.extend(parser.close())
+
+        self.assertEqual(len(statements), 2)
+        for statement in statements:
+            self.assertEqual(len(statement.moves), 59)
+            self.assertEqual(
+                statement.moves[0].communication,
+                "BORDEREAU DE DECOMPTE AVANCES    015 "
+                "NUMERO D'OPERATION 495953")
+
+    def test_feed_emits_at_trailer(self):
+        parser = CODAParser()
+
+        self.assertEqual(len(parser.feed(self.data)), 1)
+        self.assertEqual(parser.close(), [])
+
+    def test_feed_str(self):
+        parser = CODAParser()
+
+        statements = parser.feed(self.data.decode('windows-1252').strip())
+        statements += parser.close()
+
+        self.assertEqual(len(statements), 1)
+
+    def test_close_missing_trailer(self):
+        parser = CODAParser()
+        parser.feed(self.data[:129 * 10])
+
+        with self.assertRaises(ValueError):
+            parser.close()
+
+
+class TestAiterStatements(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(here, 'CODA.txt'), 'rb') as f:
+            self.data = f.read() * 2
+
+    async def collect(self, stream, **kwargs):
+        return [s async for s in aiter_statements(stream, **kwargs)]
+
+    def test_stream_reader(self):
+        async def parse():
+            stream = asyncio.StreamReader()
+            stream.feed_data(self.data)
+            stream.feed_eof()
+            return await self.collect(stream, size=1000)
+
+        statements = asyncio.run(parse())
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(len(statements[1].moves), 59)
+
+    def test_async_iterable(self):
+        async def chunks():
+            for i in range(0, len(self.data), 100):
+                yield self.data[i:i + 100]
+
+        statements = asyncio.run(self.collect(chunks()))
+
+        self.assertEqual(len(statements), 2)
+
+    def test_executor(self):
+        async def chunks():
+            yield self.data
+
+        with ThreadPoolExecutor(1) as executor:
+            statements = asyncio.run(
+                self.collect(chunks(), executor=executor))
+
+        self.assertEqual(len(statements), 2)
+
+
+class TestParseMany(unittest.TestCase):
+
+    def setUp(self):
+        self.names = [
+            os.path.join(here, 'CODA.txt'),
+            os.path.join(here, 'missing.txt'),
+            os.path.join(here, 'CODA.txt'),
+            ]
+
+    def check_results(self, results):
+        self.assertEqual(
+            sorted(n for n, _ in results), sorted(self.names))
+        for name, result in results:
+            if name.endswith('missing.txt'):
+                self.assertIsInstance(result, FileNotFoundError)
+            else:
+                self.assertEqual(len(result.statements[0].moves), 59)
+
+    def test_parse_many(self):
+        results = list(parse_many(self.names, workers=2))
+
+        self.assertEqual([n for n, _ in results], self.names)
+        self.check_results(results)
+
+    def test_parse_many_unordered(self):
+        self.check_results(
+            list(parse_many(self.names, workers=2, ordered=False)))
+
+    def test_parse_many_window(self):
+        "Test only a window of names is submitted ahead"
+        consumed = []
+
+        def names():
+            for i in range(20):
+                consumed.append(i)
+                yield os.path.join(here, 'CODA.txt')
+
+        for ordered in [True, False]:
+            with self.subTest(ordered=ordered):
+                consumed.clear()
+                results = parse_many(names(), workers=2, ordered=ordered)
+                next(results)
+
+                self.assertLessEqual(len(consumed), 5)
+                self.assertEqual(len(list(results)), 19)
+
+    def test_parse_many_in_process(self):
+        self.check_results(list(parse_many(self.names, workers=0)))
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.name = os.path.join(here, 'CODA.txt')
+
+    def check_statements(self, statements):
+        statement, = statements
+        expected, = CODA(self.name).statements
+        self.assertEqual(statement.new_balance, expected.new_balance)
+        self.assertEqual(
+            [m.amount for m in statement.all_moves],
+            [m.amount for m in expected.all_moves])
+        self.assertEqual(
+            [m.communication for m in statement.all_moves],
+            [m.communication for m in expected.all_moves])
+
+    def test_miss_hit(self):
+        cache = ParseCache(self.directory.name)
+
+        self.check_statements(CODA(self.name, cache=cache).statements)
+        self.check_statements(CODA(self.name, cache=cache).statements)
+
+        info = cache.info()
+        self.assertEqual((info.hits, info.memory_hits, info.misses), (1, 0, 1))
+        self.assertGreater(info.size, 0)
+
+    def test_parse(self):
+        cache = ParseCache(self.directory.name)
+
+        self.check_statements(cache.parse(self.name))
+        self.check_statements(cache.parse(self.name))
+
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_persistent(self):
+        CODA(self.name, cache=ParseCache(self.directory.name))
+        cache = ParseCache(self.directory.name)
+
+        self.check_statements(CODA(self.name, cache=cache).statements)
+        self.assertEqual(cache.info().hits, 1)
+
+    def test_memory(self):
+        cache = ParseCache(self.directory.name, memory=1)
+
+        first = CODA(self.name, cache=cache).statements
+        second = CODA(self.name, cache=cache).statements
+
+        self.assertEqual(cache.info().memory_hits, 1)
+        self.assertIsNot(first[0], second[0])
+        self.check_statements(second)
+
+    def test_options(self):
+        cache = ParseCache(self.directory.name)
+
+        CODA(self.name, cache=cache)
+        CODA(self.name, cache=cache, lazy=True)
+        statements = CODA(self.name, cache=cache, fields=['amount']).statements
+        CODA(self.name, cache=cache, binary=True)
+
+        self.assertEqual(cache.info().misses, 3)
+        self.assertEqual(cache.info().hits, 1)
+        self.assertIsNone(next(statements[0].all_moves).value_date)
+
+    def test_intern(self):
+        cache = ParseCache(self.directory.name)
+
+        CODA(self.name, cache=cache)
+        first, second = CODA(
+            self.name, cache=cache, intern=True).statements[0].moves[:2]
+
+        self.assertEqual(cache.info().misses, 2)
+        self.assertIs(first.statement_number, second.statement_number)
+
+    def test_buffer(self):
+        cache = ParseCache(self.directory.name)
+        with open(self.name, 'rb') as f:
+            data = bytearray(f.read())
+
+        self.check_statements(CODA(data, cache=cache).statements)
+        CODA(self.name, cache=cache)
+
+        self.assertEqual(cache.info().hits, 1)
+
+    def test_lines(self):
+        cache = ParseCache(self.directory.name)
+        with open(self.name, encoding='windows-1252') as f:
+            lines = f.readlines()
+
+        self.check_statements(CODA(lines, cache=cache).statements)
+        self.assertEqual(cache.info().misses, 0)
+
+    def test_error(self):
+        cache = ParseCache(self.directory.name)
+        with open(self.name, encoding='windows-1252') as f:
+            records = f.readlines()
+        records[-1] = records[-1][:16] + '999999' + records[-1][22:]
+        name = os.path.join(self.directory.name, 'invalid.txt')
+        with open(name, 'w', encoding='windows-1252') as f:
+            f.writelines(records)
+
+        with self.assertRaises(ValueError):
+            CODA(name, cache=cache)
+        self.assertEqual(cache.info().size, 0)
+
+    def test_version(self):
+        CODA(self.name, cache=ParseCache(self.directory.name))
+        with open(os.path.join(self.directory.name, 'VERSION'), 'w') as f:
+            f.write('0.0')
+        cache = ParseCache(self.directory.name)
+
+        self.assertEqual(cache.info().size, 0)
+        CODA(self.name, cache=cache)
+        self.assertEqual(cache.info().misses, 1)
+
+    def test_evict(self):
+        other = os.path.join(self.directory.name, 'CODA-CRLF.txt')
+        with open(self.name, 'rb') as f:
+            data = f.read()
+        with open(other, 'wb') as f:
+            f.write(data.replace(b'\n', b'\r\n'))
+        cache = ParseCache(os.path.join(self.directory.name, 'cache'))
+        CODA(self.name, cache=cache)
+        cache.max_size = cache.info().size * 3 // 2
+
+        CODA(other, cache=cache)
+        CODA(other, cache=cache)
+        CODA(self.name, cache=cache)
+
+        info = cache.info()
+        self.assertLessEqual(info.size, cache.max_size)
+        self.assertEqual((info.hits, info.misses), (1, 3))
+
+
+class TestSerialization(unittest.TestCase):
+
+    def setUp(self):
+        self.statement, = CODA(os.path.join(here, 'CODA.txt')).statements
+
+    def assertSameStatement(self, statement, expected):
+        for name in ['account', 'old_balance', 'new_balance', 'creation_date',
+                'duplicate', 'number_records', 'total_credit']:
+            self.assertEqual(
+                getattr(statement, name), getattr(expected, name))
+        moves = list(statement.all_moves)
+        expected_moves = list(expected.all_moves)
+        self.assertEqual(len(moves), len(expected_moves))
+        for move, expected_move in zip(moves, expected_moves):
+            for name in Move.__slots__:
+                if name not in {'moves', 'informations'}:
+                    self.assertEqual(
+                        getattr(move, name), getattr(expected_move, name))
+            self.assertEqual(len(move.moves), len(expected_move.moves))
+        self.assertEqual(
+            {k: [i.communication_type for i in v]
+                for k, v in statement.informations.items()},
+            {k: [i.communication_type for i in v]
+                for k, v in expected.informations.items()})
+        self.assertEqual(
+            [f.text for f in statement.free_communications],
+            [f.text for f in expected.free_communications])
+        self.assertIs(
+            statement.find_move('0002', '0001'),
+            statement.moves[1].moves[0])
+
+    def test_pickle(self):
+        statement = pickle.loads(pickle.dumps(self.statement))
+
+        self.assertIsInstance(statement, Statement)
+        self.assertSameStatement(statement, self.statement)
+
+    def test_pickle_protocols(self):
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            with self.subTest(protocol=protocol):
+                statement = pickle.loads(
+                    pickle.dumps(self.statement, protocol))
+                self.assertSameStatement(statement, self.statement)
+
+    def test_pickle_linked(self):
+        self.statement.link_informations()
+
+        statement = pickle.loads(pickle.dumps(self.statement))
+
+        move = next(m for m in statement.all_moves if m.informations)
+        self.assertIs(
+            move.informations[0],
+            statement.informations[move.bank_reference][0])
+
+    def test_pickle_lazy(self):
+        expected, = CODA(os.path.join(here, 'CODA.txt'), lazy=True).statements
+        expected.moves[0].amount
+
+        statement = pickle.loads(pickle.dumps(expected))
+
+        self.assertIs(type(statement), type(expected))
+        self.assertSameStatement(statement, self.statement)
+
+    def test_copy(self):
+        move = self.statement.moves[0]
+
+        self.assertEqual(copy.copy(move).amount, move.amount)
+        self.assertEqual(
+            copy.deepcopy(self.statement).moves[0].amount, move.amount)
+
+    def test_dumps(self):
+        statement, = loads(dumps([self.statement]))
+
+        self.assertIsInstance(statement, Statement)
+        self.assertSameStatement(statement, self.statement)
+
+    def test_dumps_information_class(self):
+        statement, = loads(dumps([self.statement]))
+
+        for type_, informations in statement.informations_by_type.items():
+            self.assertEqual(
+                [type(i) for i in informations],
+                [type(i) for i in self.statement.informations_by_type[type_]])
+
+    def test_dumps_lazy(self):
+        expected, = CODA(os.path.join(here, 'CODA.txt'), lazy=True).statements
+
+        statement, = loads(dumps([expected]))
+
+        self.assertIs(type(statement), Statement)
+        self.assertSameStatement(statement, self.statement)
+
+    def test_dumps_fields(self):
+        expected, = CODA(
+            os.path.join(here, 'CODA.txt'), fields=['value_date']).statements
+
+        statement, = loads(dumps([expected]))
+
+        move = statement.moves[0]
+        self.assertEqual(move.value_date, expected.moves[0].value_date)
+        self.assertIsNone(move.counterparty_name)
+
+    def test_dumps_size(self):
+        self.assertLess(
+            len(dumps([self.statement])), len(pickle.dumps(self.statement)))
+
+    def test_loads_version(self):
+        with self.assertRaises(ValueError):
+            loads(marshal.dumps((0, [])))
+
+
+class TestCODAWorkers(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            self.records = f.readlines()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, records):
+        name = os.path.join(self.directory.name, 'CODA.txt')
+        with open(name, 'w', encoding='windows-1252') as f:
+            f.writelines(records)
+        return name
+
+    def test_workers(self):
+        name = self.write(self.records * 5)
+
+        coda = CODA(name, workers=2)
+
+        self.assertEqual(len(coda.statements), 5)
+        for statement in coda.statements:
+            self.assertEqual(len(statement.moves), 59)
+
+    def test_workers_iter_statements(self):
+        name = self.write(self.records * 3)
+
+        statements = list(iter_statements(name, workers=2, lazy=True))
+
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(
+            statements[2].moves[0].amount, Decimal('-2578.25'))
+
+    def test_workers_invalid_statement(self):
+        records = self.records * 3
+        records[600] = records[600][:2] + '9999' + records[600][6:]
+        name = self.write(records)
+
+        with self.assertRaisesRegex(ValueError, 'Invalid statement 3'):
+            CODA(name, workers=2)
+
+
+class TestIterEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.statement, = CODA(os.path.join(here, 'CODA.txt')).statements
+
+    def test_events(self):
+        events = list(iter_events(os.path.join(here, 'CODA.txt')))
+
+        self.assertEqual(events[0][0], 'start_statement')
+        self.assertEqual(events[-1][0], 'end_statement')
+        self.assertIs(events[0][1], events[-1][1])
+        self.assertEqual(
+            [str(m) for e, m in events if e == 'move'],
+            [str(m) for m in self.statement.all_moves])
+        self.assertEqual(
+            len([i for e, i in events if e == 'information']),
+            sum(len(i) for i in self.statement.informations.values()))
+
+    def test_move(self):
+        moves = {str(m): m for e, m in iter_events(
+                os.path.join(here, 'CODA.txt')) if e == 'move'}
+
+        for move in self.statement.all_moves:
+            event_move = moves[str(move)]
+            self.assertEqual(event_move.amount, move.amount)
+            self.assertEqual(event_move.communication, move.communication)
+            self.assertEqual(
+                event_move.counterparty_name, move.counterparty_name)
+
+    def test_information_class(self):
+        informations = [i for e, i in iter_events(
+                os.path.join(here, 'CODA.txt')) if e == 'information']
+
+        for information in informations:
+            if information.communication_type == '001':
+                self.assertIsInstance(information, Information001)
+                self.assertTrue(information.name)
+
+        events = iter_events(os.path.join(here, 'CODA.txt'))
+        for event, statement in events:
+            pass
+
+        self.assertEqual(statement.new_balance, self.statement.new_balance)
+        self.assertEqual(statement.moves, [])
+
+    def test_wrong_total(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            records = f.readlines()
+        records[-1] = records[-1][:30] + '9' + records[-1][31:]
+
+        with self.assertRaises(ValueError):
+            list(iter_events(records))
+        list(iter_events(records, validate='none'))
+
+    def test_missing_trailer(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            records = f.readlines()
+
+        with self.assertRaisesRegex(ValueError, "Missing trailer record"):
+            list(iter_events(records[:-1]))
+
+    def test_orphan_article(self):
+        "Test an article without its first article raises ValueError"
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            records = f.readlines()
+        article = next(r for r in records if r.startswith('22'))
+
+        for validate in VALIDATIONS:
+            with self.subTest(validate=validate), \
+                    self.assertRaisesRegex(ValueError, "first article"):
+                list(iter_events(
+                        records[:2] + [article] + records[2:],
+                        validate=validate))
+
+
+class TestScan(unittest.TestCase):
+
+    def test_scan(self):
+        summary, = scan(os.path.join(here, 'CODA.txt'))
+
+        self.assertEqual(str(summary), '001')
+        self.assertEqual(summary.bank_id, 725)
+        self.assertEqual(summary.duplicate, False)
+        self.assertEqual(summary.creation_date, date(2006, 12, 6))
+        self.assertEqual(summary.account, '435000000080')
+        self.assertEqual(summary.account_currency, 'EUR')
+        self.assertEqual(summary.old_balance, Decimal('0.000'))
+        self.assertEqual(summary.new_balance, Decimal('9405296.990'))
+        self.assertEqual(summary.coda_sequence, '001')
+        self.assertEqual(summary.number_records, 260)
+
+    def test_scan_records(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            records = f.readlines()
+
+        summaries = list(scan(records * 2))
+
+        self.assertEqual(len(summaries), 2)
+
+    def test_scan_binary_file(self):
+        with open(os.path.join(here, 'CODA.txt'), 'rb') as f:
+            summary, = scan(f)
+
+        self.assertEqual(summary.account, '435000000080')
+        self.assertEqual(summary.new_balance, Decimal('9405296.990'))
+
+    def test_scan_carriage_returns(self):
+        with open(os.path.join(here, 'CODA.txt'), 'rb') as f:
+            data = f.read().replace(b'\r\n', b'\n').replace(b'\n', b'\r')
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'CODA.txt')
+            with open(name, 'wb') as f:
+                f.write(data)
+
+            with open(name, 'rb') as f:
+                summary, = scan(f)
+
+        self.assertEqual(summary.new_balance, Decimal('9405296.990'))
+
+    def test_scan_missing_trailer(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            records = f.readlines()
+
+        with self.assertRaisesRegex(ValueError, "Missing trailer record"):
+            list(scan(records[:-1]))
+
+    def test_scan_wrong_number_records(self):
+        with open(os.path.join(here, 'CODA.txt'),
+                encoding='windows-1252') as f:
+            records = f.readlines()
+        del records[2]
+
+        with self.assertRaises(ValueError):
+            list(scan(records))
+
+
+@unittest.skipUnless(pyarrow, "pyarrow is not installed")
+class TestParquet(unittest.TestCase):
+
+    def setUp(self):
+        self.coda = CODA(os.path.join(here, 'CODA.txt'))
+        self.statement, = self.coda.statements
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def read(self, table):
+        return pyarrow.parquet.read_table(
+            os.path.join(self.directory.name, table + '.parquet'))
+
+    def test_write(self):
+        with ParquetWriter(self.directory.name) as writer:
+            writer.write(self.statement, 'CODA.txt')
+
+        statements = self.read('statements').to_pylist()
+        moves = self.read('moves').to_pylist()
+        informations = self.read('informations').to_pylist()
+        all_moves = list(self.statement.all_moves)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(statements[0]['statement'], 0)
+        self.assertEqual(statements[0]['file'], 'CODA.txt')
+        self.assertEqual(statements[0]['account'], self.statement.account)
+        self.assertEqual(
+            statements[0]['old_balance'], self.statement.old_balance)
+        self.assertEqual(
+            statements[0]['creation_date'], self.statement.creation_date)
+        self.assertIs(statements[0]['duplicate'], False)
+        self.assertEqual(len(moves), len(all_moves))
+        self.assertEqual(
+            [m['amount'] for m in moves], [m.amount for m in all_moves])
+        self.assertEqual(
+            [m['communication'] for m in moves],
+            [m.communication for m in all_moves])
+        self.assertEqual(
+            len(informations),
+            sum(len(i) for i in self.statement.informations.values()))
+        self.assertEqual(
+            self.read('free_communications').num_rows,
+            len(self.statement.free_communications))
+
+    def test_write_parent(self):
+        with ParquetWriter(self.directory.name) as writer:
+            writer.write(self.statement)
+
+        for row in self.read('moves').to_pylist():
+            move = self.statement.find_move(
+                row['sequence'], row['detail_sequence'])
+            parent = row['parent_detail_sequence']
+            if parent is None:
+                self.assertIn(move, self.statement.moves)
+            else:
+                self.assertIn(move, self.statement.find_move(
+                        row['sequence'], parent).moves)
+
+    def test_write_batch_size(self):
+        with ParquetWriter(self.directory.name, batch_size=10) as writer:
+            writer.write(self.statement)
+            writer.write(self.statement)
+
+        metadata = pyarrow.parquet.read_metadata(
+            os.path.join(self.directory.name, 'moves.parquet'))
+        moves = len(list(self.statement.all_moves))
+        self.assertEqual(metadata.num_rows, 2 * moves)
+        self.assertEqual(metadata.num_row_groups, -(-2 * moves // 10))
+        self.assertEqual(
+            self.read('statements')['statement'].to_pylist(), [0, 1])
+
+    def test_write_fields(self):
+        coda = CODA(os.path.join(here, 'CODA.txt'), fields=['value_date'])
+        with ParquetWriter(self.directory.name) as writer:
+            writer.write(coda.statements[0])
+
+        moves = self.read('moves')
+        self.assertEqual(moves.num_rows, len(list(self.statement.all_moves)))
+        self.assertEqual(moves['communication'].null_count, moves.num_rows)
+
+    def test_write_many(self):
+        names = [
+            os.path.join(here, 'CODA.txt'),
+            os.path.join(here, 'missing.txt'),
+            os.path.join(here, 'CODA.txt'),
+            ]
+        errors = write_many(names, self.directory.name, workers=0)
+
+        self.assertEqual(list(errors), [names[1]])
+        self.assertIsInstance(errors[names[1]], FileNotFoundError)
+        self.assertEqual(
+            self.read('statements')['file'].to_pylist(),
+            [names[0], names[2]])
+        self.assertEqual(
+            self.read('moves').num_rows,
+            2 * len(list(self.statement.all_moves)))
+
+
+class TestReconciler(unittest.TestCase):
+
+    def setUp(self):
+        self.statement, = CODA(os.path.join(here, 'CODA.txt')).statements
+
+    def matches(self, reconciler, statement=None):
+        return {str(m.move): m
+            for m in reconciler.match([statement or self.statement])}
+
+    def test_structured_reference(self):
+        reconciler = Reconciler([
+                OpenItem(1, Decimal('817.56'), '+++269/0211/57996+++'),
+                OpenItem(2, Decimal(10), '702600521948'),
+                OpenItem(3, Decimal(10), '702600521947'),
+                ])
+
+        matches = self.matches(reconciler)
+
+        self.assertEqual(
+            [i.id for i in matches['00530000'].items], [1])
+        self.assertEqual(
+            matches['00530000'].method, 'structured_reference')
+        self.assertEqual(
+            [i.id for i in matches['00550000'].items], [2])
+        self.assertEqual(matches['00010000'].items, ())
+        self.assertIsNone(matches['00010000'].method)
+
+    def test_creditor_reference(self):
+        move = Move()
+        move.sequence, move.detail_sequence = '0001', '0000'
+        move.amount, move.value_date = Decimal(10), date(2006, 12, 6)
+        move._communication = '1100' + 'RF18 5390 0754 7034'
+        statement = Statement()
+        statement.moves.append(move)
+        reconciler = Reconciler([
+                OpenItem(1, Decimal(20), 'rf18539007547034'),
+                OpenItem(2, Decimal(10), 'RF18539007547035'),
+                ])
+
+        match, = reconciler.match([statement])
+
+        self.assertEqual([i.id for i in match.items], [1])
+        self.assertEqual(match.method, 'creditor_reference')
+
+    def test_amount(self):
+        move = self.statement.find_move('0001', '0000')
+        reconciler = Reconciler([
+                OpenItem(1, move.amount, None, move.value_date),
+                OpenItem(2, move.amount, None,
+                    move.value_date - timedelta(days=2)),
+                OpenItem(3, -move.amount, None, move.value_date),
+                ])
+
+        self.assertEqual(
+            [i.id for i in self.matches(reconciler)['00010000'].items], [1])
+        reconciler.days = 2
+        match = self.matches(reconciler)['00010000']
+        self.assertEqual([i.id for i in match.items], [1, 2])
+        self.assertEqual(match.method, 'amount')
+
+    def test_amount_counterparty(self):
+        "Test the items of the counterparty account are preferred"
+        move = self.statement.find_move('0053', '0000')
+        reconciler = Reconciler([
+                OpenItem(1, move.amount, None, move.value_date, 'BE00'),
+                OpenItem(2, move.amount, None, None,
+                    move.counterparty_account),
+                ])
+
+        match = self.matches(reconciler)['00530000']
+
+        self.assertEqual([i.id for i in match.items], [2])
+        self.assertEqual(match.method, 'amount')
+
+    def test_flat(self):
+        statement, = CODA(os.path.join(here, 'CODA.txt'), flat=True).statements
+        reconciler = Reconciler([OpenItem(1, None, '269021157996')])
+
+        matches = self.matches(reconciler, statement)
+
+        self.assertEqual([i.id for i in matches['00530000'].items], [1])
+
+
+class TestChainIndex(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.index = ChainIndex(os.path.join(self.directory, 'index'))
+        self.path = os.path.join(here, 'CODA.txt')
+        self.summary, = scan(self.path)
+
+    def next_file(
+            self, name, sequence='002', balance=None, duplicate=False):
+        "Write the statement following the sample"
+        with open(self.path, encoding='windows-1252') as f:
+            records = f.read().splitlines(keepends=True)
+        new_balance = records[-2][41:57]
+        for i, record in enumerate(records):
+            if record.startswith('0') and duplicate:
+                records[i] = record[:16] + 'D' + record[17:]
+            elif record.startswith('1'):
+                old_balance = balance or new_balance
+                records[i] = (record[:2] + sequence + record[5:42]
+                    + old_balance + record[58:])
+            elif record.startswith('8'):
+                # same movements as the sample
+                records[i] = (record[:1] + sequence + record[4:41]
+                    + '%016d' % (int(old_balance) + int(new_balance))
+                    + record[57:])
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='windows-1252') as f:
+            f.writelines(records)
+        return path
+
+    def test_add(self):
+        self.assertEqual(self.index.add_file(self.path), [])
+        self.assertEqual(self.index.add_file(self.next_file('2.txt')), [])
+
+        entries = self.index.entries('435000000080', 'EUR')
+        self.assertEqual(
+            [e.new_sequence for e in entries], ['001', '002'])
+        self.assertEqual(entries[1].old_balance, Decimal('9405296.99'))
+        self.assertEqual(
+            entries[1].file, os.path.join(self.directory, '2.txt'))
+
+    def test_persistent(self):
+        self.index.add(self.summary)
+
+        index = ChainIndex(self.index.directory)
+
+        self.assertEqual(
+            index.last('435000000080', 'EUR'),
+            self.index.last('435000000080', 'EUR'))
+        self.assertEqual(
+            index.last('435000000080', 'EUR').old_balance_date,
+            date(2006, 12, 6))
+
+    def test_sequence_gap(self):
+        self.index.add(self.summary)
+
+        gap, = self.index.add_file(self.next_file('3.txt', sequence='003'))
+
+        self.assertEqual(gap.kind, 'sequence')
+        self.assertEqual(gap.previous.new_sequence, '001')
+        self.assertEqual(gap.entry.old_sequence, '003')
+
+    def test_balance_gap(self):
+        self.index.add(self.summary)
+
+        gap, = self.index.add_file(
+            self.next_file('2.txt', balance='0000000000001000'))
+
+        self.assertEqual(gap.kind, 'balance')
+        self.assertEqual(gap.entry.old_balance, Decimal(1))
+
+    def test_duplicate(self):
+        self.index.add(self.summary)
+
+        gap, = self.index.add(self.summary)
+
+        self.assertEqual(gap.kind, 'duplicate')
+        self.assertEqual(len(self.index.entries('435000000080', 'EUR')), 1)
+
+    def test_resend(self):
+        "Test a statement sent again does not break the chain"
+        self.index.add(self.summary)
+        self.index.add_file(self.next_file('2.txt'))
+        last = self.index.last('435000000080', 'EUR')
+
+        gap, = self.index.add(self.summary)
+
+        self.assertEqual(gap.kind, 'duplicate')
+        self.assertEqual(gap.previous.new_sequence, '001')
+        self.assertEqual(self.index.last('435000000080', 'EUR'), last)
+        self.assertEqual(
+            ChainIndex(self.index.directory).last('435000000080', 'EUR'),
+            last)
+
+    def test_duplicate_flag(self):
+        "Test a statement marked as duplicate is not added"
+        self.index.add(self.summary)
+
+        gap, = self.index.add_file(
+            self.next_file('2.txt', duplicate=True))
+
+        self.assertEqual(gap.kind, 'duplicate')
+        self.assertIsNone(gap.previous)
+        self.assertEqual(len(self.index.entries('435000000080', 'EUR')), 1)
+
+    def test_check(self):
+        "Test check does not add"
+        self.index.add(self.summary)
+
+        self.assertEqual(len(self.index.check(self.summary)), 1)
+        self.assertEqual(len(self.index.entries('435000000080', 'EUR')), 1)
+
+    def test_statement(self):
+        statement, = CODA(self.path).statements
+
+        self.assertEqual(self.index.add(statement), [])
+        self.assertEqual(
+            self.index.last('435000000080', 'EUR').new_balance,
+            statement.new_balance)
+
+    def test_rebuild(self):
+        "Test rebuild orders the statements"
+        names = [
+            self.next_file('3.txt', sequence='003'),
+            self.next_file('2.txt'), self.path]
+        self.index.add(self.summary)
+
+        gaps = self.index.rebuild(names)
+
+        self.assertEqual([g.kind for g in gaps], ['balance'])
+        self.assertEqual(
+            [e.new_sequence
+                for e in ChainIndex(self.index.directory).entries(
+                    '435000000080', 'EUR')],
+            ['001', '002', '003'])
+
+    def test_rebuild_error(self):
+        "Test rebuild keeps the index when a file can not be read"
+        self.index.add(self.summary)
+        path = os.path.join(self.directory, 'wrong.txt')
+        with open(path, 'w') as f:
+            f.write('0' * 128 + '\n')
+
+        with self.assertRaises(ValueError):
+            self.index.rebuild([self.next_file('2.txt'), path])
+
+        self.assertEqual(
+            len(ChainIndex(self.index.directory).entries(
+                    '435000000080', 'EUR')), 1)
+
+
+class TestMergeMoves(unittest.TestCase):
+
+    def statement(self, *dates):
+        statement = Statement()
+        for day in dates:
+            move = Move()
+            move.value_date = date(2024, 1, day)
+            move.entry_date = date(2024, 2, 29 - day)
+            statement.moves.append(move)
+        return statement
+
+    def test_merge(self):
+        first = [self.statement(1, 3), self.statement(5)]
+        second = [self.statement(2, 3, 4)]
+
+        pairs = list(merge_moves([iter(first), iter(second)]))
+
+        self.assertEqual(
+            [m.value_date.day for _, m in pairs], [1, 2, 3, 3, 4, 5])
+        self.assertEqual(
+            [s for s, _ in pairs],
+            [first[0], second[0], first[0], second[0], second[0], first[1]])
+
+    def test_entry_date(self):
+        first = [self.statement(5, 1)]
+        second = [self.statement(4, 2)]
+
+        pairs = merge_moves([first, second], key='entry_date')
+
+        self.assertEqual(
+            [m.value_date.day for _, m in pairs], [5, 4, 2, 1])
+
+    def test_unordered(self):
+        "Test unordered moves are yielded as soon as read"
+        pairs = merge_moves([[self.statement(1, 4, 2)], [self.statement(3)]])
+
+        self.assertEqual([m.value_date.day for _, m in pairs], [1, 3, 4, 2])
+
+    def test_details(self):
+        inputs = [
+            iter_statements(os.path.join(here, 'CODA.txt')),
+            iter_statements(os.path.join(here, 'CODA.txt')),
+            ]
+        statement, = CODA(os.path.join(here, 'CODA.txt')).statements
+
+        pairs = list(merge_moves(inputs, details=True))
+
+        # The equal dates are yielded in the order of the inputs
+        self.assertEqual(
+            [str(m) for _, m in pairs],
+            [str(m) for m in statement.all_moves] * 2)
+
+    def test_lazy(self):
+        "Test inputs are read lazily"
+        def statements():
+            yield self.statement(1)
+            raise ValueError
+        pairs = merge_moves([statements(), [self.statement(2)]])
+
+        self.assertEqual(next(pairs)[1].value_date.day, 1)
+        with self.assertRaises(ValueError):
+            next(pairs)